@@ -3,4 +3,4 @@
 :: @see Hidden Moss: https://hiddenmoss.com/
 :: @see git repo: https://github.com/hidden-moss/xls2gd
 :: @author: Yuancheng Zhang, https://github.com/endaye
-powershell -command "python .\gui.py .\tool_xls2gd.py;pyinstaller .\tool_xls2gd.spec;cp .\dist\xls2gd.exe .\xls2gd.exe"
\ No newline at end of file
+powershell -command "python .\gui.py .\tool_xls2gd.py;pyinstaller .\tool_xls2gd.spec;cp .\dist\xls2gd.exe .\xls2gd.exe;cp .\dist\xls2gd_cli.exe .\xls2gd_cli.exe"
\ No newline at end of file
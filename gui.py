@@ -9,9 +9,12 @@
 
 import sys
 import os
+import multiprocessing
+import threading
 import wx
 import wx.richtext as rt
 import wx.lib.agw.hyperlink as hl
+import wx.lib.newevent
 import tool_xls2gd as x2l
 
 
@@ -23,13 +26,17 @@ __version__ = "v1.2.4"
 __maintainer__ = "Yuancheng Zhang"
 __status__ = "Production"
 
+# 转换线程发给界面的事件
+ProgressEvent, EVT_PROGRESS = wx.lib.newevent.NewEvent()
+ConvertDoneEvent, EVT_CONVERT_DONE = wx.lib.newevent.NewEvent()
+
 
 class MainFrame(wx.Frame):
     """Main frame of the GUI."""
     prefix_color = {
         "info": "blue",
         "error": "red",
-        "sucess": "sea green",
+        "success": "sea green",
         "failed": "red",
     }
 
@@ -109,10 +116,44 @@ class MainFrame(wx.Frame):
         self.sizer_btm_r_h = wx.BoxSizer(wx.HORIZONTAL)
 
         # Convert
+        self.sizer_btm_l_h = wx.BoxSizer(wx.HORIZONTAL)
         self.btn_convert = wx.Button(self.panel, label="Convert")
         self.Bind(wx.EVT_BUTTON, self.on_convert_click, self.btn_convert)
+        self.sizer_btm_l_h.Add(self.btn_convert, flag=wx.LEFT, border=4)
+
+        # Cancel
+        self.btn_cancel = wx.Button(self.panel, label="Cancel")
+        self.Bind(wx.EVT_BUTTON, self.on_cancel_click, self.btn_cancel)
+        self.btn_cancel.Disable()
+        self.sizer_btm_l_h.Add(self.btn_cancel, flag=wx.LEFT, border=4)
+
+        # Progress
+        self.gauge = wx.Gauge(self.panel, range=1, size=(-1, 12))
+        self.sizer_btm_l_h.Add(
+            self.gauge, proportion=1, flag=wx.LEFT | wx.ALIGN_CENTER_VERTICAL, border=8
+        )
+        self.st_progress = wx.StaticText(
+            self.panel, label="", style=wx.ST_NO_AUTORESIZE
+        )
         self.sizer_btm_l.Add((-1, 4))
-        self.sizer_btm_l.Add(self.btn_convert, flag=wx.LEFT, border=4)
+        self.sizer_btm_l.Add(self.sizer_btm_l_h, flag=wx.EXPAND)
+        self.sizer_btm_l.Add(
+            self.st_progress, flag=wx.EXPAND | wx.LEFT | wx.TOP, border=4
+        )
+
+        self.worker = None
+        self.closing = False
+        self.cancel = threading.Event()
+        # xls2gd.exe 与命令行接受相同的参数, 例如 --profile
+        self.converter = x2l.Converter(
+            sink=x2l.LogSink(self.write_logs, x2l.LOG_FLUSH_INTERVAL),
+            progress=self.post_progress,
+            cancel=self.cancel,
+            **x2l.get_options(x2l.parse_args(sys.argv[1:])),
+        )
+        self.Bind(EVT_PROGRESS, self.on_progress)
+        self.Bind(EVT_CONVERT_DONE, self.on_convert_done)
+        self.Bind(wx.EVT_CLOSE, self.on_close)
 
         # Version
         version_str = __version__ + " "
@@ -178,9 +219,74 @@ class MainFrame(wx.Frame):
             self.hide_config()
 
         self.btn_convert.Disable()
+        self.btn_cancel.Enable()
         self.clear_log()
-        x2l.run()
+        self.gauge.SetValue(0)
+        self.st_progress.SetLabel("")
+        self.cancel.clear()
+        self.worker = threading.Thread(target=self.convert, daemon=True)
+        self.worker.start()
+
+    def convert(self):
+        """Convert in the worker thread."""
+        try:
+            self.converter.run()
+        finally:
+            wx.PostEvent(self, ConvertDoneEvent())
+
+    def post_progress(self, xls_file, sheet_name, done, total, rows_per_sec):
+        """Post progress from the worker thread to the UI thread."""
+        wx.PostEvent(
+            self,
+            ProgressEvent(
+                xls_file=xls_file,
+                sheet_name=sheet_name,
+                done=done,
+                total=total,
+                rows_per_sec=rows_per_sec,
+            ),
+        )
+
+    def on_progress(self, event):
+        """Show progress of the conversion."""
+        if self.closing:
+            return
+        self.gauge.SetRange(max(event.total, 1))
+        self.gauge.SetValue(min(event.done, event.total))
+        current = event.xls_file
+        if event.sheet_name:
+            current += f" / {event.sheet_name}"
+        self.st_progress.SetLabel(
+            f"{event.done}/{event.total}  {current}  {event.rows_per_sec:.0f} rows/s"
+        )
+
+    def on_cancel_click(self, event):
+        """Cancel button clicked, the conversion stops after the current sheet."""
+        self.cancel.set()
+        self.btn_cancel.Disable()
+
+    def on_close(self, event):
+        """Stop the conversion when the window is closed.
+
+        The close is vetoed until the worker thread is done, then it is closed
+        again by on_convert_done(), so the window keeps responding meanwhile.
+        """
+        if self.worker is not None and event.CanVeto():
+            self.cancel.set()
+            self.closing = True
+            self.btn_cancel.Disable()
+            self.st_progress.SetLabel("closing after the current workbooks...")
+            event.Veto()
+            return
+        event.Skip()
+
+    def on_convert_done(self, event):
+        """The worker thread is done."""
+        self.worker = None
+        self.btn_cancel.Disable()
         self.btn_convert.Enable()
+        if self.closing:
+            self.Close()
 
     def clear_log(self):
         """Clear the log."""
@@ -190,17 +296,17 @@ class MainFrame(wx.Frame):
     def save_config(self):
         """Save the config file."""
         # print('save_config')
-        x2l.INPUT_FOLDER = self.tc1.GetValue()
-        x2l.OUTPUT_GD_FOLDER = self.tc2.GetValue()
-        x2l.OUTPUT_GD_NAME_TEMPLATE = self.tc3.GetValue()
-        x2l.OUTPUT_CSV_FOLDER = self.tc4.GetValue()
-        x2l.OUTPUT_CSV_NAME_TEMPLATE = self.tc5.GetValue()
-        x2l.save_config()
+        self.converter.input_folder = self.tc1.GetValue()
+        self.converter.output_gd_folder = self.tc2.GetValue()
+        self.converter.output_gd_name_template = self.tc3.GetValue()
+        self.converter.output_csv_folder = self.tc4.GetValue()
+        self.converter.output_csv_name_template = self.tc5.GetValue()
+        self.converter.save_config()
 
     def load_config(self):
         """Load the config file."""
         # print('load_config')
-        x2l.load_config()
+        self.converter.load_config()
         self.tc1.Clear()
         self.tc2.Clear()
         self.tc3.Clear()
@@ -211,11 +317,11 @@ class MainFrame(wx.Frame):
         self.tc3.Refresh()
         self.tc4.Refresh()
         self.tc5.Refresh()
-        self.tc1.write(x2l.INPUT_FOLDER)
-        self.tc2.write(x2l.OUTPUT_GD_FOLDER)
-        self.tc3.write(x2l.OUTPUT_GD_NAME_TEMPLATE)
-        self.tc4.write(x2l.OUTPUT_CSV_FOLDER)
-        self.tc5.write(x2l.OUTPUT_CSV_NAME_TEMPLATE)
+        self.tc1.write(self.converter.input_folder)
+        self.tc2.write(self.converter.output_gd_folder)
+        self.tc3.write(self.converter.output_gd_name_template)
+        self.tc4.write(self.converter.output_csv_folder)
+        self.tc5.write(self.converter.output_csv_name_template)
 
     def on_config_checked(self, event):
         """Config checkbox checked."""
@@ -250,14 +356,24 @@ class MainFrame(wx.Frame):
         self.panel.Layout()
         self.cb_config.SetValue(False)
 
-    def write(self, prefix, s):
-        """Write log."""
-        self.logs.WriteText("[")
-        self.logs.BeginTextColour(self.prefix_color[prefix])
-        self.logs.WriteText(prefix)
-        self.logs.EndTextColour()
-        self.logs.WriteText("]")
-        self.logs.WriteText(f" {s}\n")
+    def write_logs(self, records):
+        """Write a batch of log records in one update, from any thread."""
+        if not wx.IsMainThread():
+            wx.CallAfter(self.write_logs, records)
+            return
+        self.logs.Freeze()
+        self.logs.BeginSuppressUndo()
+        self.logs.SetInsertionPointEnd()
+        for prefix, s in records:
+            prefix = prefix["b"]
+            self.logs.WriteText("[")
+            self.logs.BeginTextColour(self.prefix_color[prefix])
+            self.logs.WriteText(prefix)
+            self.logs.EndTextColour()
+            self.logs.WriteText(f"] {s}\n")
+        self.logs.EndSuppressUndo()
+        self.logs.Thaw()
+        self.logs.ShowPosition(self.logs.GetLastPosition())
 
     def resource_path(self, relative_path):
         """Get absolute path to resource, works for dev and for PyInstaller"""
@@ -275,8 +391,6 @@ class App(wx.App):
         """Init the app."""
         self.main_frame = MainFrame(None, "Excel to GDScript Convertor")
         self.main_frame.Show()
-        if x2l:
-            x2l.set_gui(self.main_frame)
         return True
 
 
@@ -287,4 +401,5 @@ def main():
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,612 @@
+"""This module benchmarks tool_xls2gd with synthetic workbooks."""
+
+#! /usr/bin/env python
+# -*- coding: utf-8 -*
+# @description: Benchmark of tool_xls2gd
+# @copyright Hidden Moss, https://hiddenmoss.com/
+# @author Yuancheng Zhang, https://github.com/endaye
+# @see repo: https://github.com/hidden-moss/xls2gd
+
+import os
+import sys
+import time
+import json
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+import re
+import struct
+import zipfile
+from xml.sax.saxutils import escape
+import tool_xls2gd as x2l
+
+__authors__ = ["Yuancheng Zhang"]
+__copyright__ = "Copyright 2025, Hidden Moss"
+__credits__ = ["Yuancheng Zhang"]
+__license__ = "MIT"
+__version__ = "v1.2.4"
+__maintainer__ = "Yuancheng Zhang"
+__status__ = "Development"
+
+# column type: cell value of row i
+CELLS = {
+    x2l.INT: lambda i: i,
+    x2l.FLOAT: lambda i: i * 0.5,
+    x2l.STRING: lambda i: f"name_{i % 100}",
+    x2l.BOOL: lambda i: i % 2 == 0,
+    x2l.INT_ARR: lambda i: f"{i},{i + 1},{i + 2},{i + 3}",
+    x2l.FLOAT_ARR: lambda i: f"{i}.5,{i + 1}.5,{i + 2}.5",
+    x2l.STRING_ARR: lambda i: f"tag_{i % 7},tag_{i % 11},tag_{i % 13}",
+    x2l.BOOL_ARR: lambda i: "true,false,true",
+    x2l.VECTOR2: lambda i: f"{i},{i + 1}",
+    x2l.VECTOR3: lambda i: f"{i},{i + 1},{i + 2}",
+    x2l.COLOR: lambda i: "1,0.5,0.25,1",
+    x2l.GDSCRIPT: lambda i: f'preload("res://icons/{i % 50}.png")',
+    x2l.TRANSLATE: lambda i: f"text {i}\nline two",
+    x2l.COMMENT: lambda i: f"comment {i}",
+}
+
+ALL_TYPES = list(CELLS)
+ARRAY_TYPES = [x2l.INT_ARR, x2l.FLOAT_ARR, x2l.STRING_ARR, x2l.BOOL_ARR]
+
+# scenario name: (key depth, kv sheet, value column types)
+SCENARIOS = {
+    "key1": (1, False, ALL_TYPES),
+    "key2": (2, False, ALL_TYPES),
+    "key3": (3, False, ALL_TYPES),
+    "kv": (1, True, [x2l.STRING]),
+    "arrays": (1, False, ARRAY_TYPES * 4),
+    "wide": (1, False, ALL_TYPES * 4),
+}
+
+
+def make_sheet_rows(key_depth, is_kv, types, rows):
+    """Make rows of an "o-" sheet: description, title, type, key and data."""
+    if is_kv:
+        columns = [("key", x2l.STRING, x2l.KEY_1), ("value", x2l.STRING, "")]
+    else:
+        keys = [x2l.KEY_1, x2l.KEY_2, x2l.KEY_3][:key_depth]
+        columns = [(f"id{n + 1}", x2l.INT, k) for n, k in enumerate(keys)]
+        columns += [(f"{t.strip('[]')}_{n}", t, "") for n, t in enumerate(types)]
+
+    yield [f"desc of {c[0]}" for c in columns]
+    yield [c[0] for c in columns]
+    yield [c[1] for c in columns]
+    yield [c[2] for c in columns]
+    for i in range(rows):
+        if is_kv:
+            yield [f"KEY_{i}", f"value {i}"]
+            continue
+        if key_depth == 1:
+            key_values = [i]
+        elif key_depth == 2:
+            key_values = [i // 100, i % 100]
+        else:
+            key_values = [i // 1000, i // 10 % 100, i % 10]
+        values = [CELLS[t](i) for _, t, k in columns if not k]
+        yield key_values + values
+
+
+XML_HEAD = '<?xml version="1.0" encoding="UTF-8"?>'
+NS_PACKAGE = "http://schemas.openxmlformats.org/package/2006"
+NS_OFFICE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+NS_SHEET = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+CT_OFFICE = "application/vnd.openxmlformats-officedocument.spreadsheetml"
+CT_RELS = "application/vnd.openxmlformats-package.relationships+xml"
+
+
+def write_xlsx(filename, sheets):
+    """Write a minimal *.xlsx with inline strings, no extra package needed."""
+    with zipfile.ZipFile(filename, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr(
+            "[Content_Types].xml",
+            f'{XML_HEAD}<Types xmlns="{NS_PACKAGE}/content-types">'
+            f'<Default Extension="rels" ContentType="{CT_RELS}"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml"'
+            f' ContentType="{CT_OFFICE}.sheet.main+xml"/>'
+            + "".join(
+                f'<Override PartName="/xl/worksheets/sheet{n + 1}.xml"'
+                f' ContentType="{CT_OFFICE}.worksheet+xml"/>'
+                for n in range(len(sheets))
+            )
+            + "</Types>",
+        )
+        z.writestr(
+            "_rels/.rels",
+            f'{XML_HEAD}<Relationships xmlns="{NS_PACKAGE}/relationships">'
+            f'<Relationship Id="rId1" Type="{NS_OFFICE}/officeDocument"'
+            ' Target="xl/workbook.xml"/>'
+            "</Relationships>",
+        )
+        z.writestr(
+            "xl/workbook.xml",
+            f'{XML_HEAD}<workbook xmlns="{NS_SHEET}" xmlns:r="{NS_OFFICE}"><sheets>'
+            + "".join(
+                f'<sheet name="{escape(name)}" sheetId="{n + 1}" r:id="rId{n + 1}"/>'
+                for n, name in enumerate(sheets)
+            )
+            + "</sheets></workbook>",
+        )
+        z.writestr(
+            "xl/_rels/workbook.xml.rels",
+            f'{XML_HEAD}<Relationships xmlns="{NS_PACKAGE}/relationships">'
+            + "".join(
+                f'<Relationship Id="rId{n + 1}" Type="{NS_OFFICE}/worksheet"'
+                f' Target="worksheets/sheet{n + 1}.xml"/>'
+                for n in range(len(sheets))
+            )
+            + "</Relationships>",
+        )
+        for n, rows in enumerate(sheets.values()):
+            with z.open(f"xl/worksheets/sheet{n + 1}.xml", "w") as f:
+                f.write(f'{XML_HEAD}<worksheet xmlns="{NS_SHEET}"><sheetData>'.encode())
+                for row_idx, row in enumerate(rows):
+                    f.write(make_xlsx_row(row_idx, row).encode("utf-8"))
+                f.write(b"</sheetData></worksheet>")
+
+
+def make_xlsx_row(row_idx, row):
+    """Make a <row> element of an *.xlsx sheet."""
+    cells = []
+    for col_idx, value in enumerate(row):
+        ref = f"{get_col_name(col_idx)}{row_idx + 1}"
+        if value == "":
+            continue
+        if isinstance(value, bool):
+            cells.append(f'<c r="{ref}" t="b"><v>{int(value)}</v></c>')
+        elif isinstance(value, (int, float)):
+            cells.append(f'<c r="{ref}"><v>{value}</v></c>')
+        else:
+            cells.append(f'<c r="{ref}" t="inlineStr"><is><t>{escape(value)}</t></is></c>')
+    return f'<row r="{row_idx + 1}">{"".join(cells)}</row>'
+
+
+def get_col_name(col_idx):
+    """Get column name like "AB" from a column index."""
+    name = ""
+    col_idx += 1
+    while col_idx:
+        col_idx, rem = divmod(col_idx - 1, 26)
+        name = chr(ord("A") + rem) + name
+    return name
+
+
+def write_xls(filename, sheets):
+    """Write an *.xls with xlwt, which comes with xlutils."""
+    import xlwt  # pylint: disable=import-outside-toplevel
+
+    book = xlwt.Workbook()
+    for name, rows in sheets.items():
+        sheet = book.add_sheet(name)
+        for row_idx, row in enumerate(rows):
+            for col_idx, value in enumerate(row):
+                if value != "":
+                    sheet.write(row_idx, col_idx, value)
+    book.save(filename)
+
+
+def make_workbook(folder, scenario, rows, fmt):
+    """Make a synthetic workbook of a scenario, return its filename."""
+    key_depth, is_kv, types = SCENARIOS[scenario]
+    name = f"o-kv-{scenario}" if is_kv else f"o-{scenario}"
+    sheets = {
+        name: make_sheet_rows(key_depth, is_kv, types, rows),
+        "scratch": iter([["not exported"]]),
+    }
+    filename = os.path.join(folder, f"bench_{scenario}.{fmt}")
+    if fmt == "xls":
+        write_xls(filename, sheets)
+    else:
+        write_xlsx(filename, sheets)
+    return filename
+
+
+def get_dir_size(folder):
+    """Get total size of files in a folder."""
+    return sum(e.stat().st_size for e in os.scandir(folder) if e.is_file())
+
+
+def bench_workbook(conv, filename, rows, repeat):
+    """Time make_table(), write_to_gd_script() and write_to_csv() separately.
+
+    The outputs are written by the Converter `conv`.
+    The best time of each stage is kept.
+    """
+    in_size = os.path.getsize(filename)
+    best = {"parse": None, "gd": None, "csv": None}
+    out_size = {"gd": 0, "csv": 0}
+    for _ in range(repeat):
+        out_dir = tempfile.mkdtemp(prefix="xls2gd_bench_")
+        gd_dir, csv_dir = os.path.join(out_dir, "gd"), os.path.join(out_dir, "csv")
+        os.mkdir(gd_dir)
+        os.mkdir(csv_dir)
+        # the binary output mode needs a Godot project
+        with open(os.path.join(out_dir, "project.godot"), "w", encoding="utf-8"):
+            pass
+        try:
+            t0 = time.perf_counter()
+            excel, ret, err_str = x2l.make_table(filename)
+            t1 = time.perf_counter()
+            if ret != 0:
+                raise RuntimeError(err_str)
+
+            # csv is timed on its own below
+            excel_gd = dict(excel)
+            excel_gd["meta"] = {
+                k: dict(v, has_csv=False) for k, v in excel["meta"].items()
+            }
+            conv.write_to_gd_script(excel_gd, gd_dir, csv_dir, filename)
+            t2 = time.perf_counter()
+            for sheet_name, meta in excel["meta"].items():
+                if meta["has_csv"] and excel["csv"][sheet_name]:
+                    conv.write_to_csv(excel["csv"][sheet_name], sheet_name, csv_dir, filename)
+            t3 = time.perf_counter()
+
+            for stage, seconds in (("parse", t1 - t0), ("gd", t2 - t1), ("csv", t3 - t2)):
+                if best[stage] is None or seconds < best[stage]:
+                    best[stage] = seconds
+            out_size = {"gd": get_dir_size(gd_dir), "csv": get_dir_size(csv_dir)}
+        finally:
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+    return {
+        "rows": rows,
+        "input_bytes": in_size,
+        "output_bytes": out_size,
+        "seconds": best,
+        "rows_per_second": {k: rows / v if v else 0 for k, v in best.items()},
+        "mb_per_second": {
+            "parse": in_size / best["parse"] / 1e6 if best["parse"] else 0,
+            "gd": out_size["gd"] / best["gd"] / 1e6 if best["gd"] else 0,
+            "csv": out_size["csv"] / best["csv"] / 1e6 if best["csv"] else 0,
+        },
+    }
+
+
+class RawGD(str):
+    """GDScript expression kept as text."""
+
+
+def bytes_to_var(data, pos=0):
+    """Decode a value like bytes_to_var() of Godot 4, return (value, end)."""
+    header = struct.unpack_from("<I", data, pos)[0]
+    var_type, is_64 = header & 0xFF, bool(header & x2l.VAR_FLAG_64)
+    pos += 4
+    if var_type == x2l.VAR_NIL:
+        return None, pos
+    if var_type == x2l.VAR_BOOL:
+        return bool(struct.unpack_from("<i", data, pos)[0]), pos + 4
+    if var_type == x2l.VAR_INT:
+        fmt = "<q" if is_64 else "<i"
+        return struct.unpack_from(fmt, data, pos)[0], pos + struct.calcsize(fmt)
+    if var_type == x2l.VAR_FLOAT:
+        fmt = "<d" if is_64 else "<f"
+        return struct.unpack_from(fmt, data, pos)[0], pos + struct.calcsize(fmt)
+    if var_type in (x2l.VAR_STRING, x2l.VAR_STRING_NAME):
+        size = struct.unpack_from("<I", data, pos)[0]
+        value = data[pos + 4 : pos + 4 + size].decode("utf-8")
+        pos += 4 + size + (-size % 4)
+        return (x2l.StringName(value) if var_type == x2l.VAR_STRING_NAME else value), pos
+    vectors = {
+        x2l.VAR_VECTOR2: (x2l.Vector2, 2),
+        x2l.VAR_VECTOR3: (x2l.Vector3, 3),
+        x2l.VAR_COLOR: (x2l.Color, 4),
+    }
+    if var_type in vectors:
+        cls, size = vectors[var_type]
+        fmt = f"<{size}{'d' if is_64 and cls is not x2l.Color else 'f'}"
+        return cls(struct.unpack_from(fmt, data, pos)), pos + struct.calcsize(fmt)
+    if var_type in (x2l.VAR_DICTIONARY, x2l.VAR_ARRAY):
+        count = struct.unpack_from("<I", data, pos)[0] & 0x7FFFFFFF
+        pos += 4
+        if var_type == x2l.VAR_ARRAY:
+            values = []
+            for _ in range(count):
+                value, pos = bytes_to_var(data, pos)
+                values.append(value)
+            return values, pos
+        values = {}
+        for _ in range(count):
+            key, pos = bytes_to_var(data, pos)
+            value, pos = bytes_to_var(data, pos)
+            values[tuple(key) if isinstance(key, list) else key] = value
+        return values, pos
+    raise RuntimeError(f"variant type {var_type} is not supported")
+
+
+GD_TOKEN = re.compile(
+    r'\s*(&?"(?:[^"\\]|\\.)*"|[{}\[\](),:]|[^\s{}\[\](),:"]+)'
+)
+
+
+def parse_gd_literal(text):
+    """Parse a GDScript literal made by tool_xls2gd into Python values.
+
+    Values that are not literals, like preload(), are kept as RawGD.
+    """
+    tokens = GD_TOKEN.findall(text)
+    return parse_gd_value(tokens, 0)[0]
+
+
+def parse_gd_value(tokens, pos):
+    """Parse a value from tokens, return (value, next position)."""
+    tok = tokens[pos]
+    if tok == "{":
+        values = {}
+        pos += 1
+        while tokens[pos] != "}":
+            key, pos = parse_gd_value(tokens, pos)
+            value, pos = parse_gd_value(tokens, pos + 1)
+            values[tuple(key) if isinstance(key, list) else key] = value
+            pos += 1 if tokens[pos] == "," else 0
+        return values, pos + 1
+    if tok == "[":
+        values = []
+        pos += 1
+        while tokens[pos] != "]":
+            value, pos = parse_gd_value(tokens, pos)
+            values.append(value)
+            pos += 1 if tokens[pos] == "," else 0
+        return values, pos + 1
+    if tok in ("Vector2", "Vector3", "Color") and tokens[pos + 1] == "(":
+        end = tokens.index(")", pos)
+        values = [float(x) for x in tokens[pos + 2 : end] if x != ","]
+        return getattr(x2l, tok)(values), end + 1
+    if tok.startswith('&"'):
+        return x2l.StringName(x2l.gd_unescape(tok[2:-1])), pos + 1
+    if tok.startswith('"'):
+        return x2l.gd_unescape(tok[1:-1]), pos + 1
+    if tok in ("true", "false"):
+        return tok == "true", pos + 1
+    if tok == "null":
+        return None, pos + 1
+    try:
+        return x2l.parse_number(tok), pos + 1
+    except RuntimeError:
+        pass
+    # an expression, kept as text until the end of the value
+    start, depth = pos, 0
+    while depth > 0 or tokens[pos] not in (",", "}", "]"):
+        depth += tokens[pos] in ("(", "[", "{")
+        depth -= tokens[pos] in (")", "]", "}")
+        pos += 1
+    return RawGD("".join(tokens[start:pos])), pos
+
+
+def f32(v):
+    """Round a float to 32 bits."""
+    return struct.unpack("<f", struct.pack("<f", v))[0]
+
+
+def same_var(a, b):
+    """Check two values are the same, with types, floats of vectors are 32-bit."""
+    if type(a) is not type(b) and not (
+        isinstance(a, RawGD) and isinstance(b, RawGD)
+    ):
+        return False
+    if isinstance(a, dict):
+        return list(a) == list(b) and all(same_var(a[k], b[k]) for k in a)
+    if isinstance(a, (x2l.Vector2, x2l.Vector3, x2l.Color)):
+        return len(a) == len(b) and all(f32(x) == f32(y) for x, y in zip(a, b))
+    if isinstance(a, list):
+        return len(a) == len(b) and all(same_var(x, y) for x, y in zip(a, b))
+    return a == b
+
+
+def check_binary(filename):
+    """Check the binary output holds the same data as the GDScript const.
+
+    GDScript columns are merged from the loader, like _load() does in Godot.
+    Return the names of sheets which are different.
+    """
+    excel, ret, err_str = x2l.make_table(filename)
+    if ret != 0:
+        raise RuntimeError(err_str)
+    different = []
+    out_dir = tempfile.mkdtemp(prefix="xls2gd_check_")
+    try:
+        with open(os.path.join(out_dir, "project.godot"), "w", encoding="utf-8"):
+            pass
+        for mode in (x2l.MODE_GD, x2l.MODE_BIN):
+            conv = x2l.Converter({"output_mode": mode})
+            conv.records = []
+            os.mkdir(os.path.join(out_dir, mode))
+            conv.write_to_gd_script(excel, os.path.join(out_dir, mode), out_dir, filename)
+
+        for sheet_name in excel["data"]:
+            gd_file_name = conv.output_gd_name_template.format(sheet_name=sheet_name)
+            bin_file_name = os.path.splitext(gd_file_name)[0] + ".bin"
+            with open(os.path.join(out_dir, x2l.MODE_GD, gd_file_name), encoding="utf-8") as f:
+                literal = parse_gd_literal(f.read().split(" = ", 1)[1])
+            with open(os.path.join(out_dir, x2l.MODE_BIN, bin_file_name), "rb") as f:
+                binary, _ = bytes_to_var(f.read())
+            with open(os.path.join(out_dir, x2l.MODE_BIN, gd_file_name), encoding="utf-8") as f:
+                loader = f.read()
+            if "const _GD = " in loader:
+                gd_cols = loader.split("const _GD = ", 1)[1].split("\r\n}\r\n", 1)[0]
+                merge_gd(binary, parse_gd_literal(gd_cols + "}"))
+            if not same_var(literal, binary):
+                different.append(sheet_name)
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+    return different
+
+
+def merge_gd(data, gd):
+    """Merge GDScript columns into rows, like _merge() of the loader."""
+    for key, value in gd.items():
+        if isinstance(next(iter(value.values()), None), dict):
+            merge_gd(data[key], value)
+        else:
+            data[key].update(value)
+
+
+def print_results(results):
+    """Print results as a table."""
+    print(
+        f"{'scenario':12} {'rows':>8} {'stage':6} {'seconds':>9} {'rows/s':>11} {'MB/s':>8}"
+    )
+    for scenario, result in results.items():
+        for stage in ("parse", "gd", "csv"):
+            seconds = result["seconds"][stage]
+            if stage == "csv" and not result["output_bytes"]["csv"]:
+                continue
+            print(
+                f"{scenario:12} {result['rows']:>8} {stage:6} {seconds:>9.4f}"
+                f" {result['rows_per_second'][stage]:>11.0f}"
+                f" {result['mb_per_second'][stage]:>8.2f}"
+            )
+
+
+def time_command(args, cwd, repeat, env=None):
+    """Run a command N times, return its best and median seconds."""
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            args,
+            cwd=cwd,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=True,
+        )
+        seconds.append(time.perf_counter() - start)
+    return {"best": min(seconds), "median": statistics.median(seconds)}
+
+
+def bench_startup(folder, exe, repeat):
+    """Time `--help` and a no-op run of tool_xls2gd, as a script, a module
+    and the frozen build if its path is given.
+
+    The no-op run converts a project whose workbook is already converted, so
+    it is only the startup, the config and the manifest.
+    """
+    script = os.path.abspath(x2l.__file__)
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(script))
+    os.makedirs(os.path.join(folder, "xls"))
+    make_workbook(os.path.join(folder, "xls"), "key1", 100, "xlsx")
+    with open(os.path.join(folder, x2l.CONFIG_FILE), "w", encoding="utf-8") as f:
+        config = dict(
+            x2l.DEFAULT_CONFIG,
+            input_folder="./xls/",
+            output_gd_folder="./gd/",
+            output_csv_folder="./csv/",
+        )
+        json.dump(config, f, indent=True)
+    targets = {
+        "python": [sys.executable, "-c", "pass"],
+        "script": [sys.executable, script],
+        "module": [sys.executable, "-m", "tool_xls2gd"],
+    }
+    if exe:
+        targets["frozen"] = [os.path.abspath(exe)]
+    # 先转换一次, 之后的运行都没有要转换的文件
+    subprocess.run(
+        targets["script"], cwd=folder, env=env, stdout=subprocess.DEVNULL, check=True
+    )
+    results = {}
+    for target, args in targets.items():
+        runs = {"no-op": args}
+        if target != "python":
+            runs = {"--help": args + ["--help"], "no-op": args}
+        for run, run_args in runs.items():
+            results[f"{target} {run}"] = time_command(run_args, folder, repeat, env)
+    return results
+
+
+def print_startup_results(results):
+    """Print startup results as a table."""
+    print(f"{'command':16} {'best ms':>9} {'median ms':>10}")
+    for command, result in results.items():
+        print(
+            f"{command:16} {result['best'] * 1000:>9.1f}"
+            f" {result['median'] * 1000:>10.1f}"
+        )
+
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        prog="tool_bench", description="Benchmark tool_xls2gd with synthetic workbooks."
+    )
+    parser.add_argument("-r", "--rows", type=int, default=20000, help="data rows per sheet")
+    parser.add_argument(
+        "-s",
+        "--scenario",
+        action="append",
+        choices=list(SCENARIOS),
+        help="scenarios to run, all by default",
+    )
+    parser.add_argument(
+        "--format", choices=["xlsx", "xls"], default="xlsx", help="workbook format"
+    )
+    parser.add_argument("-n", "--repeat", type=int, default=3, help="best of N runs")
+    parser.add_argument("-o", "--output", help="write results to a JSON file")
+    parser.add_argument(
+        "--mode",
+        choices=[x2l.MODE_GD, x2l.MODE_BIN, x2l.MODE_COLUMNS],
+        default=x2l.MODE_GD,
+        help="output mode of tool_xls2gd",
+    )
+    parser.add_argument(
+        "--check-binary",
+        action="store_true",
+        help="check the binary output decodes to the same data, no timing",
+    )
+    parser.add_argument(
+        "--startup",
+        action="store_true",
+        help="time the startup of tool_xls2gd instead of converting",
+    )
+    parser.add_argument(
+        "--exe", help="the frozen build to time with --startup, e.g. xls2gd_cli.exe"
+    )
+    return parser.parse_args(argv)
+
+
+def main():
+    """Main function."""
+    args = parse_args(sys.argv[1:])
+    if args.startup:
+        with tempfile.TemporaryDirectory(prefix="xls2gd_startup_") as folder:
+            results = bench_startup(folder, args.exe, args.repeat)
+        print_startup_results(results)
+        if args.output:
+            report = {"version": x2l.__version__, "startup": results}
+            with open(args.output, "w", encoding="utf-8") as json_file:
+                json_file.write(json.dumps(report, indent=True))
+        return
+
+    conv = x2l.Converter({"output_mode": args.mode})
+    # keep output records instead of logging them
+    conv.records = []
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="xls2gd_bench_") as folder:
+        for scenario in args.scenario or list(SCENARIOS):
+            filename = make_workbook(folder, scenario, args.rows, args.format)
+            if args.check_binary:
+                different = check_binary(filename)
+                status = f"different: {', '.join(different)}" if different else "same"
+                print(f"{scenario:12} {status}")
+                if different:
+                    sys.exit(1)
+                continue
+            results[scenario] = bench_workbook(conv, filename, args.rows, args.repeat)
+            conv.records.clear()
+
+    if args.check_binary:
+        return
+
+    print_results(results)
+    if args.output:
+        report = {"version": x2l.__version__, "format": args.format, "results": results}
+        with open(args.output, "w", encoding="utf-8") as json_file:
+            json_file.write(json.dumps(report, indent=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,4 +3,4 @@
 :: @see Hidden Moss: https://hiddenmoss.com/
 :: @see git repo: https://github.com/hidden-moss/xls2gd
 :: @author: Yuancheng Zhang, https://github.com/endaye
-powershell -command "python .\tool_xls2gd.py"
+powershell -command "python -m tool_xls2gd"
@@ -0,0 +1,295 @@
+"""This module keeps tool_xls2gd warm in a daemon, and is its thin client."""
+
+#! /usr/bin/env python
+# -*- coding: utf-8 -*
+# @description: Daemon and client of tool_xls2gd
+# @copyright Hidden Moss, https://hiddenmoss.com/
+# @author Yuancheng Zhang, https://github.com/endaye
+# @see repo: https://github.com/hidden-moss/xls2gd
+
+import os
+import sys
+import time
+import json
+import hashlib
+import tempfile
+import argparse
+import threading
+from multiprocessing.connection import Listener, Client
+
+__authors__ = ["Yuancheng Zhang"]
+__copyright__ = "Copyright 2025, Hidden Moss"
+__credits__ = ["Yuancheng Zhang"]
+__license__ = "MIT"
+__version__ = "v1.2.4"
+__maintainer__ = "Yuancheng Zhang"
+__status__ = "Development"
+
+# 客户端等待新启动的守护进程的秒数
+START_TIMEOUT = 10.0
+START_INTERVAL = 0.05
+
+
+def get_address(folder):
+    """Get the address of the daemon of a project folder.
+
+    It is a named pipe on Windows and a Unix socket elsewhere.
+    """
+    key = hashlib.sha1(os.path.abspath(folder).encode("utf-8")).hexdigest()[:12]
+    if sys.platform == "win32":
+        return rf"\\.\pipe\xls2gd-{key}"
+    return os.path.join(tempfile.gettempdir(), f"xls2gd-{os.getuid()}-{key}.sock")
+
+
+def send(conn, message):
+    """Send a message as JSON."""
+    conn.send_bytes(json.dumps(message).encode("utf-8"))
+
+
+def recv(conn):
+    """Receive a message sent by send()."""
+    return json.loads(conn.recv_bytes().decode("utf-8"))
+
+
+class Daemon:
+    """A warm converter serving the requests of a project folder.
+
+    The converter keeps the config and the manifest between requests, and
+    its process pool is started once. Convert and check requests run one at
+    a time, status is answered at once.
+    """
+
+    def __init__(self, address, jobs):
+        # 只有守护进程需要导入转换模块, 客户端保持轻量
+        import concurrent.futures  # pylint: disable=import-outside-toplevel
+        import tool_xls2gd as x2l  # pylint: disable=import-outside-toplevel
+
+        self.x2l = x2l
+        self.address = address
+        self.executor = None
+        if jobs > 1:
+            self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=jobs)
+        self.converter = x2l.Converter(
+            jobs=jobs,
+            config_file=x2l.CONFIG_FILE,
+            manifest_file=x2l.MANIFEST_FILE,
+            executor=self.executor,
+            cache=x2l.TableCache(x2l.CACHE_FOLDER),
+        )
+        self.lock = threading.Lock()
+        self.start_time = time.time()
+        self.request_cnt = 0
+        self.busy = False
+        self.last = None
+        self.stopped = False
+
+    def serve(self):
+        """Accept requests until a stop request or Ctrl+C."""
+        if sys.platform != "win32" and os.path.exists(self.address):
+            try:
+                Client(self.address).close()
+            except OSError:
+                os.unlink(self.address)  # left by a killed daemon
+            else:
+                raise RuntimeError(f"a daemon is already running at {self.address}")
+        listener = Listener(self.address)
+        if sys.platform != "win32":
+            os.chmod(self.address, 0o600)
+        self.log(f"serving: \t\t{self.address}")
+        try:
+            while not self.stopped:
+                conn = listener.accept()
+                threading.Thread(target=self.handle, args=(conn,), daemon=True).start()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            listener.close()
+            if self.executor is not None:
+                self.executor.shutdown()
+            self.log("stop serving.")
+
+    def handle(self, conn):
+        """Serve one request."""
+        with conn:
+            try:
+                msg = recv(conn)
+                cmd = msg.get("cmd")
+            except (EOFError, OSError, ValueError, AttributeError):
+                return  # the client is gone
+            if cmd in ("convert", "check"):
+                reply = self.run(conn, msg)
+            elif cmd in ("status", "stop"):
+                reply = {"status": self.get_status()}
+            elif cmd is not None:
+                reply = {"error": f'unknown command "{cmd}"'}
+            else:
+                return
+            try:
+                send(conn, reply)
+            except (EOFError, OSError):
+                pass  # the client is gone
+            if cmd == "stop":
+                self.stop()
+
+    def run(self, conn, msg):
+        """Convert or check, the logs are sent to the client as they come.
+
+        Return the reply, the result, or the error if the converter raised.
+        """
+        x2l = self.x2l
+        with self.lock:
+            self.busy = True
+            conv = self.converter
+            conv.force = bool(msg.get("force"))
+            conv.sink = x2l.LogSink(
+                lambda records: send(conn, {"logs": records}), x2l.LOG_FLUSH_INTERVAL
+            )
+            try:
+                result = conv.run(check=msg["cmd"] == "check")
+            except Exception as err:  # pylint: disable=broad-except
+                error = x2l.format_error(err)
+                x2l.write_console([(x2l.ERROR, error)])
+                self.last = {"error": error}
+                return {"error": error}
+            finally:
+                conv.force = False
+                self.busy = False
+                self.request_cnt += 1
+            keys = ("error", "gd_cnt", "written_cnt", "unchanged_cnt", "error_cnt")
+            self.last = {k: result[k] for k in keys}
+            return {"result": result}
+
+    def get_status(self):
+        """Get the status of the daemon."""
+        return {
+            "version": self.x2l.__version__,
+            "pid": os.getpid(),
+            "folder": os.getcwd(),
+            "uptime": round(time.time() - self.start_time, 1),
+            "requests": self.request_cnt,
+            "busy": self.busy,
+            "last": self.last,
+        }
+
+    def stop(self):
+        """Stop serving, accept() is woken up by a connection."""
+        self.stopped = True
+        Client(self.address).close()
+
+    def log(self, s):
+        """Log to the console of the daemon."""
+        self.x2l.write_console([(self.x2l.INFO, s)])
+
+
+def connect(address, start, jobs):
+    """Connect to the daemon, start it first if `start` and it is not running."""
+    try:
+        return Client(address)
+    except OSError:
+        if not start:
+            raise
+    start_daemon(jobs)
+    deadline = time.monotonic() + START_TIMEOUT
+    while True:
+        time.sleep(START_INTERVAL)
+        try:
+            return Client(address)
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+
+
+def start_daemon(jobs):
+    """Start a daemon of the current folder in the background."""
+    import subprocess  # pylint: disable=import-outside-toplevel
+
+    args = [sys.executable, os.path.abspath(__file__), "serve", "-j", str(jobs)]
+    options = {}
+    if sys.platform == "win32":
+        options["creationflags"] = (
+            subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+        )
+    else:
+        options["start_new_session"] = True
+    subprocess.Popen(  # pylint: disable=consider-using-with
+        args,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        **options,
+    )
+
+
+def write_logs(records, color):
+    """Write log records sent by the daemon."""
+    key = "c" if color else "b"
+    sys.stdout.write("".join(f"[{prefix[key]}] {s}\n" for prefix, s in records))
+    sys.stdout.flush()
+
+
+def request(args):
+    """Send a request to the daemon and print its logs and reply.
+
+    Return the exit code: 1 if a conversion failed or a check found errors.
+    """
+    address = get_address(".")
+    start = args.cmd in ("convert", "check")
+    try:
+        conn = connect(address, start, args.jobs)
+    except OSError:
+        print(f"[info] no daemon at {address}")
+        return 0 if args.cmd == "stop" else 1
+    with conn:
+        send(conn, {"cmd": args.cmd, "force": args.force})
+        while True:
+            reply = recv(conn)
+            if "logs" not in reply:
+                break
+            write_logs(reply["logs"], args.c)
+    if "error" in reply:
+        print(f"[error] {reply['error']}")
+        return 1
+    if "status" in reply:
+        for k, v in reply["status"].items():
+            print(f"[info] {k}: \t{v}")
+        return 0
+    result = reply["result"]
+    return 1 if result["error"] or result["error_cnt"] > 0 else 0
+
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        prog="tool_daemon",
+        description="Keep tool_xls2gd running for the current folder, "
+        "and send it requests. convert and check start the daemon if needed.",
+    )
+    parser.add_argument("cmd", choices=["serve", "convert", "check", "status", "stop"])
+    parser.add_argument("-c", action="store_true", help="colorful logs")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="processes of the daemon, 0 for all cores, 1 by default",
+    )
+    parser.add_argument(
+        "-f", "--force", action="store_true", help="reconvert unchanged workbooks"
+    )
+    return parser.parse_args(argv)
+
+
+def main():
+    """Main function."""
+    args = parse_args(sys.argv[1:])
+    if args.jobs <= 0:
+        args.jobs = os.cpu_count() or 1
+    if args.cmd == "serve":
+        Daemon(get_address("."), args.jobs).serve()
+        return
+    sys.exit(request(args))
+
+
+if __name__ == "__main__":
+    main()
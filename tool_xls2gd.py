@@ -7,16 +7,20 @@
 # @author Yuancheng Zhang, https://github.com/endaye
 # @see repo: https://github.com/hidden-moss/xls2gd
 
+# 启动时只导入轻量模块, xlrd 等较重的模块在首次使用时导入
 import os
 import os.path
 import sys
-import datetime
-import codecs
-import subprocess
+import time
+import io
 import json
-import re
-import csv
-import xlrd
+import struct
+import itertools
+import collections
+import posixpath
+import contextlib
+import functools
+import threading
 
 __authors__ = ["Yuancheng Zhang"]
 __copyright__ = "Copyright 2025, Hidden Moss"
@@ -26,11 +30,13 @@ __version__ = "v1.2.4"
 __maintainer__ = "Yuancheng Zhang"
 __status__ = "Development"
 
-INPUT_FOLDER = "./"
-OUTPUT_GD_FOLDER = "./"
-OUTPUT_GD_NAME_TEMPLATE = "data_{sheet_name}.gd"
-OUTPUT_CSV_FOLDER = "./"
-OUTPUT_CSV_NAME_TEMPLATE = "locale_{sheet_name}.csv"
+DEFAULT_CONFIG = {
+    "input_folder": "./",
+    "output_gd_folder": "./",
+    "output_gd_name_template": "data_{sheet_name}.gd",
+    "output_csv_folder": "./",
+    "output_csv_name_template": "locale_{sheet_name}.csv",
+}
 
 
 INFO = {"c": "\033[36minfo\033[0m", "b": "info"}
@@ -57,96 +63,427 @@ GDSCRIPT, COMMENT = "gdscript", "comment"
 TRANSLATE = "translate"
 DEFAULT_LANG = "zh_CN"
 
+# output mode
+MODE_GD, MODE_BIN, MODE_COLUMNS = "gd", "bin", "columns"
+# 分片输出 shard_rows: 每个分片的最大行数, 0 为不分片
+# 字符串表 intern_strings: 不使用, 每个表一个, 或整次转换共用一个
+INTERN_OFF, INTERN_SHEET, INTERN_RUN = "off", "sheet", "run"
+STRING_TABLE_NAME = "_strings"
+
 CONFIG_FILE = "tool_xls2gd.config"
+MANIFEST_FILE = "tool_xls2gd.manifest"
+# 解析结果缓存: 只改输出配置时不用重新读取表格
+CACHE_FOLDER = "tool_xls2gd.cache"
+CACHE_SIZE = 256 << 20
 
 KEY_1, KEY_2, KEY_3 = "key1", "key2", "key3"
 
-GUI = None
-GD_CNT = 0
-MAX_XLS_NAME_LEN = 0
-IS_COLOR = False
+# cell types, the same as xlrd's, so xlrd is imported only for *.xls
+XL_CELL_EMPTY, XL_CELL_TEXT, XL_CELL_NUMBER, XL_CELL_DATE = 0, 1, 2, 3
+XL_CELL_BOOLEAN, XL_CELL_ERROR = 4, 5
+XL_ERROR_CODES = {
+    "#NULL!": 0x00,
+    "#DIV/0!": 0x07,
+    "#VALUE!": 0x0F,
+    "#REF!": 0x17,
+    "#NAME?": 0x1D,
+    "#NUM!": 0x24,
+    "#N/A": 0x2A,
+}
+
+WATCH_INTERVAL = 0.2
+WATCH_DELAY = 0.5
+PROFILE_TOP = 5
+
+
+class XlrdReader:
+    """Workbook reader of xlrd, used for legacy *.xls.
+
+    The workbook is opened on demand, so only the sheets being read are
+    loaded, and each sheet is unloaded once its rows are consumed.
+    """
+
+    def __init__(self, filename):
+        import xlrd  # pylint: disable=import-outside-toplevel
+
+        self.book = xlrd.open_workbook(filename, on_demand=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def sheet_names(self):
+        """Get sheet names."""
+        return self.book.sheet_names()
+
+    def read_sheet(self, name):
+        """Get the column count and a row iterator of (values, types)."""
+        sheet = self.book.sheet_by_name(name)
+        return sheet.ncols, self.iter_rows(sheet, name)
+
+    def iter_rows(self, sheet, name):
+        """Iterate rows of (values, types), the sheet is unloaded at the end."""
+        try:
+            for row_idx in range(sheet.nrows):
+                yield sheet.row_values(row_idx), sheet.row_types(row_idx)
+        finally:
+            self.book.unload_sheet(name)
+
+    def close(self):
+        """Release the workbook."""
+        self.book.release_resources()
+
+
+class XlsxReader:
+    """Streaming workbook reader of *.xlsx and *.xlsm.
+
+    Sheets are parsed row by row from the XML, and each row is dropped
+    after use, so memory does not grow with the row count.
+    Cell types are the same as xlrd's.
+    """
+
+    NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+    NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+    NS_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+    DATE_FORMAT_IDS = set(range(14, 23)) | set(range(27, 37)) | set(range(45, 48))
+    DATE_FORMAT_IDS |= set(range(50, 59))
+
+    def __init__(self, filename):
+        import zipfile  # pylint: disable=import-outside-toplevel
+
+        self.zip = zipfile.ZipFile(filename)
+        self.sheets = self.load_sheets()
+        self.shared_strings = self.load_shared_strings()
+        self.date_styles = self.load_date_styles()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def load_sheets(self):
+        """Load sheet names and their XML paths in order."""
+        import xml.etree.ElementTree as ET  # pylint: disable=import-outside-toplevel
+
+        rels = {}
+        with self.zip.open("xl/_rels/workbook.xml.rels") as f:
+            for rel in ET.parse(f).getroot():
+                target = rel.get("Target")
+                if target.startswith("/"):
+                    target = target[1:]
+                else:
+                    target = posixpath.normpath(posixpath.join("xl", target))
+                rels[rel.get("Id")] = target
+        sheets = {}
+        with self.zip.open("xl/workbook.xml") as f:
+            for sheet in ET.parse(f).getroot().iter(self.NS + "sheet"):
+                sheets[sheet.get("name")] = rels[sheet.get(self.NS_REL + "id")]
+        return sheets
+
+    def load_shared_strings(self):
+        """Load shared strings incrementally."""
+        import xml.etree.ElementTree as ET  # pylint: disable=import-outside-toplevel
+
+        strings = []
+        if "xl/sharedStrings.xml" not in self.zip.namelist():
+            return strings
+        with self.zip.open("xl/sharedStrings.xml") as f:
+            for _, elem in ET.iterparse(f):
+                if elem.tag == self.NS + "si":
+                    strings.append(self.get_text(elem))
+                    elem.clear()
+        return strings
+
+    def load_date_styles(self):
+        """Load indexes of cell styles with date formats."""
+        import xml.etree.ElementTree as ET  # pylint: disable=import-outside-toplevel
+        import re  # pylint: disable=import-outside-toplevel
+
+        date_styles = set()
+        if "xl/styles.xml" not in self.zip.namelist():
+            return date_styles
+        with self.zip.open("xl/styles.xml") as f:
+            root = ET.parse(f).getroot()
+        date_formats = set(self.DATE_FORMAT_IDS)
+        for fmt in root.iter(self.NS + "numFmt"):
+            code = re.sub(r'"[^"]*"|\[[^\]]*\]|\\.', "", fmt.get("formatCode", ""))
+            if any(c in code.lower() for c in "ymdhs"):
+                date_formats.add(int(fmt.get("numFmtId")))
+        cell_xfs = root.find(self.NS + "cellXfs")
+        if cell_xfs is not None:
+            for idx, xf in enumerate(cell_xfs.iter(self.NS + "xf")):
+                if int(xf.get("numFmtId", 0)) in date_formats:
+                    date_styles.add(idx)
+        return date_styles
+
+    def get_text(self, elem):
+        """Get text of a string item, phonetic runs are skipped."""
+        if elem.find(self.NS + "r") is None:
+            t = elem.find(self.NS + "t")
+            return (t.text or "") if t is not None else ""
+        return "".join(
+            t.text or "" for r in elem.iter(self.NS + "r") for t in r.iter(self.NS + "t")
+        )
+
+    def sheet_names(self):
+        """Get sheet names."""
+        return list(self.sheets)
+
+    def read_sheet(self, name):
+        """Get the column count and a row iterator of (values, types).
+
+        The sheet dimension is only a hint, some writers leave it stale or
+        write "A1", so the column count is the bigger of it and the widest of
+        the first four rows, the header rows.
+        """
+        import xml.etree.ElementTree as ET  # pylint: disable=import-outside-toplevel
+
+        f = self.zip.open(self.sheets[name])
+        events = ET.iterparse(f, events=("start", "end"))
+        ncols, sheet_data = 0, None
+        for event, elem in events:
+            if event == "start" and elem.tag == self.NS + "dimension":
+                ref = elem.get("ref", "").split(":")[-1]
+                ncols = self.get_col_idx(ref) + 1 if ref else 0
+            elif event == "start" and elem.tag == self.NS + "sheetData":
+                sheet_data = elem
+                break
+        rows = self.iter_rows(f, events, sheet_data)
+        head = list(itertools.islice(rows, 4))
+        ncols = max([ncols] + [len(values) for values, _ in head])
+        rows = itertools.chain(head, rows)
+        return ncols, self.pad_rows(rows, ncols)
+
+    def iter_rows(self, f, events, sheet_data):
+        """Iterate rows of (values, types), missing rows are empty."""
+        row_idx = 0
+        try:
+            for event, elem in events:
+                if event != "end" or elem.tag != self.NS + "row":
+                    continue
+                r = elem.get("r")
+                next_idx = int(r) - 1 if r else row_idx
+                while row_idx < next_idx:
+                    yield [], []
+                    row_idx += 1
+                yield self.read_row(elem)
+                row_idx += 1
+                if sheet_data is not None:
+                    sheet_data.clear()
+        finally:
+            f.close()
+
+    def read_row(self, row):
+        """Read a row element into (values, types)."""
+        values, types = [], []
+        for c in row.iter(self.NS + "c"):
+            ref = c.get("r")
+            col_idx = self.get_col_idx(ref) if ref else len(values)
+            while len(values) < col_idx:
+                values.append("")
+                types.append(XL_CELL_EMPTY)
+            value, vtype = self.read_cell(c)
+            values.append(value)
+            types.append(vtype)
+        return values, types
+
+    def read_cell(self, c):
+        """Read a cell element into (value, type) as xlrd does."""
+        t = c.get("t", "n")
+        if t == "inlineStr":
+            elem = c.find(self.NS + "is")
+            if elem is None:
+                return "", XL_CELL_EMPTY
+            return self.get_text(elem), XL_CELL_TEXT
+        v = c.find(self.NS + "v")
+        if v is None or v.text is None:
+            return "", XL_CELL_EMPTY
+        if t == "s":
+            return self.shared_strings[int(v.text)], XL_CELL_TEXT
+        if t in ("str", "d"):
+            return v.text, XL_CELL_TEXT
+        if t == "b":
+            return int(v.text), XL_CELL_BOOLEAN
+        if t == "e":
+            return XL_ERROR_CODES.get(v.text, 0), XL_CELL_ERROR
+        if int(c.get("s", 0)) in self.date_styles:
+            return float(v.text), XL_CELL_DATE
+        return float(v.text), XL_CELL_NUMBER
+
+    @staticmethod
+    def pad_rows(rows, ncols):
+        """Pad rows to the column count, longer rows are kept whole."""
+        for values, types in rows:
+            if len(values) < ncols:
+                values.extend([""] * (ncols - len(values)))
+                types.extend([XL_CELL_EMPTY] * (ncols - len(types)))
+            yield values, types
+
+    @staticmethod
+    def get_col_idx(ref):
+        """Get column index from a cell reference like "AB12"."""
+        col_idx = 0
+        for ch in ref:
+            if not ch.isalpha():
+                break
+            col_idx = col_idx * 26 + ord(ch.upper()) - ord("A") + 1
+        return col_idx - 1
+
+    def close(self):
+        """Release the workbook."""
+        self.zip.close()
+
+
+# 读取器 file extension: reader class
+READERS = {
+    ".xls": XlrdReader,
+    ".xlsx": XlsxReader,
+    ".xlsm": XlsxReader,
+}
+
+
+def open_book(filename):
+    """Open a workbook with the reader of its file extension."""
+    ext = os.path.splitext(filename)[1].lower()
+    return READERS.get(ext, XlrdReader)(filename)
+
+
+class ConvertCancelled(RuntimeError):
+    """The conversion is cancelled by the cancel event of a Converter."""
+
+
+class Table:
+    """A parsed sheet, kept small for big workbooks.
+
+    `columns` are the titles shared by all rows, `rows` are tuples in the
+    order of `columns`, and `index` maps key1 [-> key2 [-> key3]] to row
+    numbers in `rows`.
+    """
+
+    __slots__ = ("columns", "rows", "index")
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.rows = []
+        self.index = {}
+
+
+def iter_index(index, depth):
+    """Iterate row numbers of an index in key order."""
+    if depth == 1:
+        yield from index.values()
+        return
+    for value in index.values():
+        yield from iter_index(value, depth - 1)
 
 
-def make_table(filename):
-    """Make tables from excel file."""
+def select_columns(table, cols):
+    """Get a table with the given columns only, sharing the index."""
+    positions = [table.columns.index(k) for k in cols]
+    selected = Table(tuple(cols))
+    selected.rows = [tuple(row[p] for p in positions) for row in table.rows]
+    selected.index = table.index
+    return selected
+
+
+def make_table(filename, errors=None, conv=None):
+    """Make tables from excel file, see read_tables() for `errors` and `conv`."""
     if not os.path.isfile(filename):
         raise NameError(f"{filename} is not a valid filename")
-    book_xlrd = xlrd.open_workbook(filename)
+    time_start = time.perf_counter()
+    with open_book(filename) as book:
+        time_open = time.perf_counter() - time_start
+        excel, ret, err_str = read_tables(book, filename, errors, conv)
+    if ret == 0:
+        excel["metrics"]["open"] = time_open
+    return excel, ret, err_str
+
+
+def read_tables(book, filename, errors=None, conv=None):
+    """Make tables from an opened workbook.
+
+    Without `errors` the first error is returned. With an `errors` list,
+    every error is appended to it as (sheet, row, column, message) and
+    reading goes on: a sheet with a header error is skipped, and so is a
+    row with a key error. Rows and columns count from 1, or are None.
+    With a Converter `conv`, the progress is reported after each sheet and
+    the conversion can be cancelled between sheets.
+    """
+
+    def fail(err_str, sheet, row=None, col=None):
+        """Keep an error, return True if reading must stop."""
+        if errors is None:
+            return True
+        errors.append((sheet, row, col, err_str))
+        return False
 
     excel = {}
     excel["filename"] = filename
     excel["data"] = {}
     excel["meta"] = {}
     excel["csv"] = {}
+    excel["metrics"] = {"open": 0.0, "sheets": {}}
 
-    for sheet in book_xlrd.sheets():
-        sheet_name = sheet.name.replace(" ", "_")
+    for name in book.sheet_names():
+        sheet_name = name.replace(" ", "_")
         if not sheet_name.startswith("o-"):
             continue
+        if conv is not None:
+            conv.check_cancel()
 
         sheet_name_array = sheet_name.split("-")
         sheet_name = sheet_name_array[-1]
 
         # log(sheet_name +' sheet')
-        data = excel["data"][sheet_name] = {}
         meta = excel["meta"][sheet_name] = {}
         t_csv = excel["csv"][sheet_name] = {}
         meta["kv"] = "kv" in sheet_name_array
         meta["has_csv"] = False
+        time_start = time.perf_counter()
 
         # 必须大于4行
-        if sheet.nrows < 4:
-            return {}, -1, f"sheet[{sheet_name}] rows must > 4"
+        ncols, sheet_rows = book.read_sheet(name)
+        head = list(itertools.islice(sheet_rows, 4))
+        if len(head) < 4:
+            err_str = f"sheet[{sheet_name}] rows must > 4"
+            if fail(err_str, sheet_name):
+                return {}, -1, err_str
+            continue
 
-        # 解析标题和类型
+        # 解析标题和类型，标题行和类型行只读取一次
+        title_values, title_types = head[1]
+        type_values, type_types = head[2]
+        titles = [str(x).replace(" ", "_") for x in title_values]
         col_idx = 1
         type_dict = {}
-        for col_idx in range(sheet.ncols):
-            title = str(sheet.cell_value(1, col_idx)).replace(" ", "_")
-            title_type = sheet.cell_type(1, col_idx)
-            type_name = str(sheet.cell_value(2, col_idx)).lower()
-            type_type = sheet.cell_type(2, col_idx)
+        header_ok = True
+        for col_idx in range(ncols):
+            title = titles[col_idx]
+            title_type = title_types[col_idx]
+            type_name = str(type_values[col_idx]).lower()
+            type_type = type_types[col_idx]
             # 检查标题数据格式
-            if title is None:
-                return (
-                    {},
-                    -1,
-                    f"sheet[{sheet_name}] title columns[{col_idx + 1}] must be String",
-                )
-            if title_type != xlrd.XL_CELL_TEXT:
-                return (
-                    {},
-                    -1,
-                    f"sheet[{sheet_name}] title columns[{col_idx + 1}] must be String",
-                )
+            if title is None or title_type != XL_CELL_TEXT:
+                err_str = f"sheet[{sheet_name}] title columns[{col_idx + 1}] must be String"
+                if fail(err_str, sheet_name, 2, col_idx + 1):
+                    return {}, -1, err_str
+                header_ok = False
             # 检查类型数据格式
-            if type_type != xlrd.XL_CELL_TEXT:
-                return (
-                    {},
-                    -1,
-                    f"sheet[{sheet_name}] type columns[{col_idx + 1}] must be String",
-                )
-            if (
-                type_name != INT
-                and type_name != FLOAT
-                and type_name != STRING
-                and type_name != BOOL
-                and type_name != INT_ARR
-                and type_name != FLOAT_ARR
-                and type_name != STRING_ARR
-                and type_name != BOOL_ARR
-                and type_name != VECTOR2
-                and type_name != VECTOR3
-                and type_name != COLOR
-                and type_name != COMMENT
-                and type_name != GDSCRIPT
-                and type_name != TRANSLATE
-            ):
-                return (
-                    {},
-                    -1,
-                    f"sheet[{sheet_name}] type column[{col_idx + 1}] type wrong",
-                )
+            if type_type != XL_CELL_TEXT:
+                err_str = f"sheet[{sheet_name}] type columns[{col_idx + 1}] must be String"
+                if fail(err_str, sheet_name, 3, col_idx + 1):
+                    return {}, -1, err_str
+                header_ok = False
+                continue
+            if type_name not in TYPE_REGISTRY:
+                err_str = f"sheet[{sheet_name}] type column[{col_idx + 1}] type wrong"
+                if fail(err_str, sheet_name, 3, col_idx + 1):
+                    return {}, -1, err_str
+                header_ok = False
+                continue
             type_dict[title] = type_name
             if type_name == TRANSLATE:
                 meta["has_csv"] = True
@@ -155,18 +492,20 @@ def make_table(filename):
 
         # *读取主键key1，key2，key3，主键类型必须是Int或者String
         row_idx, col_idx = 3, 0
-        for col_idx in range(sheet.ncols):
-            key = str(sheet.cell_value(row_idx, col_idx)).lower()
-            col_name = str(sheet.cell_value(1, col_idx))
-            col_type = str(sheet.cell_value(2, col_idx)).lower()
+        key_values = head[row_idx][0]
+        key_cols = {}
+        for col_idx in range(ncols):
+            key = str(key_values[col_idx]).lower()
+            col_name = titles[col_idx]
+            col_type = str(type_values[col_idx]).lower()
             if key in (KEY_1, KEY_2, KEY_3):
                 if col_type not in (INT, FLOAT, STRING):
-                    return (
-                        {},
-                        -1,
-                        f"sheet[{sheet_name}] {key} type must be Int, Float, or String",
-                    )
+                    err_str = f"sheet[{sheet_name}] {key} type must be Int, Float, or String"
+                    if fail(err_str, sheet_name, 4, col_idx + 1):
+                        return {}, -1, err_str
+                    header_ok = False
                 meta[key] = col_name
+                key_cols[key] = col_idx + 1
 
         # 检查主键
         if (
@@ -174,57 +513,55 @@ def make_table(filename):
             or (KEY_2 in meta and KEY_1 not in meta)
             or (KEY_1 not in meta)
         ):
-            return {}, -1, f"sheet[{sheet_name}] {KEY_1} {KEY_2} {KEY_3} are wrong"
+            err_str = f"sheet[{sheet_name}] {KEY_1} {KEY_2} {KEY_3} are wrong"
+            if fail(err_str, sheet_name, 4):
+                return {}, -1, err_str
+            header_ok = False
+
+        # 表头有错误时不检查数据
+        if not header_ok:
+            continue
 
         key1 = meta[KEY_1] if KEY_1 in meta else None
         key2 = meta[KEY_2] if KEY_2 in meta else None
         key3 = meta[KEY_3] if KEY_3 in meta else None
 
-        # 读取数据，从第5行开始
-        row_idx = 4
-        for row_idx in range(row_idx, sheet.nrows):
-            row = {}
+        # 跳过注释列，每列的读取函数只查找一次
+        # 同名的列只占一个位置，取最后一列的值
+        col_pos = {}
+        for col_idx in range(ncols):
+            if type_dict[titles[col_idx]] != COMMENT:
+                col_pos.setdefault(titles[col_idx], len(col_pos))
+        columns = [
+            (
+                col_idx,
+                titles[col_idx],
+                TYPE_REGISTRY[type_dict[titles[col_idx]]][0],
+                type_dict[titles[col_idx]] == TRANSLATE,
+                col_pos[titles[col_idx]],
+            )
+            for col_idx in range(ncols)
+            if type_dict[titles[col_idx]] != COMMENT
+        ]
+        table = excel["data"][sheet_name] = Table(tuple(col_pos))
+        data, rows = table.index, table.rows
+        width = len(col_pos)
+        # 重复的字符串只保留一份
+        strings = {}
+
+        time_header = time.perf_counter()
+        row_count = 0
+
+        # 读取数据，从第5行开始，整行读取
+        for row_idx, (row_values, row_types) in enumerate(sheet_rows, 4):
+            row_count += 1
+            row = [None] * width
             key_v1, key_v3, key_v2 = None, None, None
-            lang_kv = {}
 
-            for col_idx in range(sheet.ncols):
-                title = sheet.cell_value(1, col_idx)
-                value = sheet.cell_value(row_idx, col_idx)
-                vtype = sheet.cell_type(row_idx, col_idx)
+            for col_idx, title, read_cell, is_translate, pos in columns:
                 # 本行有数据
-                v = None
-                if type_dict[title] == INT and vtype == xlrd.XL_CELL_NUMBER:
-                    v = int(value)
-                elif type_dict[title] == FLOAT and vtype == xlrd.XL_CELL_NUMBER:
-                    v = float(value)
-                elif type_dict[title] == STRING:
-                    v = format_str(value)
-                elif type_dict[title] == BOOL and vtype == xlrd.XL_CELL_BOOLEAN:
-                    v = "true" if value == 1 else "false"
-                elif type_dict[title] == INT_ARR and vtype == xlrd.XL_CELL_TEXT:
-                    v = str(value)
-                elif type_dict[title] == FLOAT_ARR and vtype == xlrd.XL_CELL_TEXT:
-                    v = str(value)
-                elif type_dict[title] == STRING_ARR:
-                    v = format_str(value)
-                elif type_dict[title] == BOOL_ARR and vtype == xlrd.XL_CELL_TEXT:
-                    v = str(value)
-                elif type_dict[title] == VECTOR2 and vtype == xlrd.XL_CELL_TEXT:
-                    v = str(value)
-                elif type_dict[title] == VECTOR3 and vtype == xlrd.XL_CELL_TEXT:
-                    v = str(value)
-                elif type_dict[title] == COLOR and vtype == xlrd.XL_CELL_TEXT:
-                    v = str(value)
-                elif type_dict[title] == GDSCRIPT and vtype in (
-                    xlrd.XL_CELL_TEXT,
-                    xlrd.XL_CELL_NUMBER,
-                ):
-                    v = str(value)
-                elif type_dict[title] == GDSCRIPT and vtype == xlrd.XL_CELL_BOOLEAN:
-                    v = "true" if value == 1 else "false"
-                elif type_dict[title] == TRANSLATE and vtype == xlrd.XL_CELL_TEXT:
-                    v = str(value)
-                    v = v.replace("\n", "\\n")
+                v = read_cell(row_values[col_idx], row_types[col_idx])
+                if is_translate and v is not None:
                     key_csv = ""
                     if key_v1 is not None and key_v2 is not None and key_v3 is not None:
                         key_csv = f"{sheet_name}_{title}_{key_v1}_{key_v2}_{key_v3}"
@@ -236,10 +573,9 @@ def make_table(filename):
                     t_csv[key_csv] = str(v)
                     v = key_csv
 
-                elif type_dict[title] == COMMENT:
-                    continue
-
-                row[title] = v
+                if isinstance(v, str):
+                    v = strings.setdefault(v, v)
+                row[pos] = v
 
                 if title == key1:
                     key_v1 = v
@@ -257,64 +593,202 @@ def make_table(filename):
                 if key_v2 not in data[key_v1]:
                     data[key_v1][key_v2] = {}
                 if key_v3 is None:
-                    return (
-                        {},
-                        -1,
-                        f'sheet[{sheet_name}][{row_idx + 1}] {KEY_3} data "{key3}" is empty',
+                    err_str = (
+                        f"sheet[{sheet_name}][{row_idx + 1}] {KEY_3}"
+                        f' data "{key3}" is empty'
                     )
+                    if fail(err_str, sheet_name, row_idx + 1, key_cols[KEY_3]):
+                        return {}, -1, err_str
+                    continue
                 elif key_v3 in data[key_v1][key_v2]:
-                    return (
-                        {},
-                        -1,
-                        f'sheet[{sheet_name}][{row_idx + 1}] {KEY_3} data "{key3}" is duplicated',
+                    err_str = (
+                        f"sheet[{sheet_name}][{row_idx + 1}] {KEY_3}"
+                        f' data "{key3}" is duplicated'
                     )
+                    if fail(err_str, sheet_name, row_idx + 1, key_cols[KEY_3]):
+                        return {}, -1, err_str
+                    continue
                 else:
-                    data[key_v1][key_v2][key_v3] = row
-                    lang_suffix = f"{key_v1}_{key_v2}_{key_v3}"
+                    data[key_v1][key_v2][key_v3] = len(rows)
             elif not (key1 is None or key2 is None):
                 if key_v1 not in data:
                     data[key_v1] = {}
                 if key_v2 is None:
-                    return (
-                        {},
-                        -1,
-                        f'sheet[{sheet_name}][{row_idx + 1}] {KEY_2} data "{key2}" is empty',
+                    err_str = (
+                        f"sheet[{sheet_name}][{row_idx + 1}] {KEY_2}"
+                        f' data "{key2}" is empty'
                     )
+                    if fail(err_str, sheet_name, row_idx + 1, key_cols[KEY_2]):
+                        return {}, -1, err_str
+                    continue
                 elif key_v2 in data[key_v1]:
-                    return (
-                        {},
-                        -1,
-                        f'sheet[{sheet_name}][{row_idx + 1}] {KEY_2} data "{key2}" is duplicated',
+                    err_str = (
+                        f"sheet[{sheet_name}][{row_idx + 1}] {KEY_2}"
+                        f' data "{key2}" is duplicated'
                     )
+                    if fail(err_str, sheet_name, row_idx + 1, key_cols[KEY_2]):
+                        return {}, -1, err_str
+                    continue
                 else:
-                    data[key_v1][key_v2] = row
-                    lang_suffix = f"{key_v1}_{key_v2}"
+                    data[key_v1][key_v2] = len(rows)
             elif key1 is not None:
                 if key_v1 is None:
-                    return (
-                        {},
-                        -1,
-                        f'sheet[{sheet_name}][{row_idx + 1}] {KEY_1} data "{key1}" is empty',
+                    err_str = (
+                        f"sheet[{sheet_name}][{row_idx + 1}] {KEY_1}"
+                        f' data "{key1}" is empty'
                     )
+                    if fail(err_str, sheet_name, row_idx + 1, key_cols[KEY_1]):
+                        return {}, -1, err_str
+                    continue
                 elif key_v1 in data:
-                    return (
-                        {},
-                        -1,
-                        f'sheet[{sheet_name}][{row_idx + 1}] {KEY_1} data "{key1}" is duplicated',
+                    err_str = (
+                        f"sheet[{sheet_name}][{row_idx + 1}] {KEY_1}"
+                        f' data "{key1}" is duplicated'
                     )
+                    if fail(err_str, sheet_name, row_idx + 1, key_cols[KEY_1]):
+                        return {}, -1, err_str
+                    continue
                 else:
-                    data[key_v1] = row
-                    lang_suffix = str(key_v1)
+                    data[key_v1] = len(rows)
             else:
-                return {}, -1, f'sheet[{sheet_name}] missing "Key"s'
-
-            for k, v in lang_kv.items():
-                lang_id = v + lang_suffix
-                row[k] = lang_id
+                err_str = f'sheet[{sheet_name}] missing "Key"s'
+                if fail(err_str, sheet_name):
+                    return {}, -1, err_str
+                break
+
+            rows.append(tuple(row))
+
+        time_rows = time.perf_counter()
+        excel["metrics"]["sheets"][sheet_name] = {
+            "header": time_header - time_start,
+            "rows": time_rows - time_header,
+            "row_count": row_count,
+            "cell_count": row_count * len(columns),
+        }
+        if conv is not None:
+            conv.report_progress(sheet_name, row_count)
 
     return excel, 0, "ok"
 
 
+class TableCache:
+    """Tables made by make_table(), kept on disk between runs.
+
+    An entry is keyed by the content hash of the workbook and the hash of
+    this module, so it is valid whatever the config is, and a changed parser
+    never reads an old entry. Entries are JSON, the Table objects are made
+    again on load. When the folder is larger than `size` bytes, the least
+    recently used entries are removed, a hit refreshes the mtime of its entry.
+    """
+
+    def __init__(self, folder, size=CACHE_SIZE):
+        self.folder = folder
+        self.size = size
+
+    def get_filename(self, file_hash):
+        """Get the entry filename of a workbook."""
+        return os.path.join(self.folder, f"{file_hash}-{get_source_hash()}.json")
+
+    def load(self, file_hash, filename):
+        """Load the tables of a workbook, None if they are not cached."""
+        cache_file = self.get_filename(file_hash)
+        time_start = time.perf_counter()
+        try:
+            with open(cache_file, "rb") as f:
+                entry = json.loads(f.read().decode("utf-8"))
+            excel = {
+                "filename": filename,
+                "data": {k: table_from_json(v) for k, v in entry["data"].items()},
+                "meta": entry["meta"],
+                "csv": entry["csv"],
+            }
+            sheets = entry["sheets"]
+            os.utime(cache_file)
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return None  # missing or broken, written again after parsing
+        # 没有打开和解析表格, open 为读取缓存的时间
+        excel["metrics"] = {
+            "open": time.perf_counter() - time_start,
+            "cached": True,
+            "sheets": {
+                sheet_name: dict(sheet, header=0.0, rows=0.0)
+                for sheet_name, sheet in sheets.items()
+            },
+        }
+        return excel
+
+    def save(self, file_hash, excel):
+        """Save the tables of a workbook, before they are written out."""
+        entry = {
+            "data": {k: table_to_json(v) for k, v in excel["data"].items()},
+            "meta": excel["meta"],
+            "csv": excel["csv"],
+            "sheets": {
+                sheet_name: {k: sheet[k] for k in ("row_count", "cell_count")}
+                for sheet_name, sheet in excel["metrics"]["sheets"].items()
+            },
+        }
+        content = json.dumps(entry, separators=(",", ":")).encode("utf-8")
+        if len(content) > self.size:
+            return
+        os.makedirs(self.folder, exist_ok=True)
+        write_file(self.get_filename(file_hash), content)
+
+    def evict(self):
+        """Remove the least recently used entries until the folder fits `size`."""
+        try:
+            entries = [e for e in os.scandir(self.folder) if e.is_file()]
+        except FileNotFoundError:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime_ns, reverse=True)
+        total = 0
+        for entry in entries:
+            total += entry.stat().st_size
+            if total > self.size:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+
+@functools.lru_cache(maxsize=None)
+def get_source_hash():
+    """Get the hash of this module, the version in a frozen build without it."""
+    if os.path.isfile(__file__):
+        return get_file_hash(__file__)[:12]
+    return __version__
+
+
+def table_to_json(table):
+    """Get a Table as JSON values.
+
+    The index is nested [key, value] pairs, so int and float keys stay so.
+    """
+
+    def dump_index(index):
+        return [
+            [k, dump_index(v) if isinstance(v, dict) else v] for k, v in index.items()
+        ]
+
+    return {
+        "columns": table.columns,
+        "rows": table.rows,
+        "index": dump_index(table.index),
+    }
+
+
+def table_from_json(value):
+    """Make a Table from the JSON values of table_to_json()."""
+
+    def load_index(pairs):
+        return {k: load_index(v) if isinstance(v, list) else v for k, v in pairs}
+
+    table = Table(tuple(value["columns"]))
+    table.rows = [tuple(row) for row in value["rows"]]
+    table.index = load_index(value["index"])
+    return table
+
+
 def format_str(v):
     """Format strings."""
     if isinstance(v, int) or isinstance(v, float):
@@ -494,116 +968,310 @@ def get_translate(v):
     return get_string(v)
 
 
-def write_to_gd_script(excel, output_gd_path, output_csv_path, xls_file):
-    """Write to GDScript."""
-    for sheet_name, sheet in excel["data"].items():
-        meta = excel["meta"][sheet_name]
-        type_dict = meta["type_dict"]
-        key1 = meta[KEY_1] if KEY_1 in meta else None
-        key2 = meta[KEY_2] if KEY_2 in meta else None
-        key3 = meta[KEY_3] if KEY_3 in meta else None
+def read_int(value, vtype):
+    """Read interger cell."""
+    return int(value) if vtype == XL_CELL_NUMBER else None
 
-        gd_file_name = OUTPUT_GD_NAME_TEMPLATE.format(sheet_name=sheet_name)
-        suffix = ""
-        outfp = codecs.open(output_gd_path + "/" + gd_file_name, "w", "utf-8")
-        outfp.write(SCRIPT_HEAD % (excel["filename"].replace(".//", "")))
-        outfp.write("const " + sheet_name + suffix + " = {\r\n")
-
-        if key1 and key2 and key3:
-            write_to_gd_key(sheet, [key1, key2, key3], type_dict, outfp, 1)
-        elif key1 and key2:
-            write_to_gd_key(sheet, [key1, key2], type_dict, outfp, 1)
-        elif key1 and (not meta["kv"]):
-            write_to_gd_key(sheet, [key1], type_dict, outfp, 1)
-        elif key1:
-            # key-value style sheet
-            write_to_gd_kv(sheet, [key1], type_dict, outfp, 1)
-        else:
-            outfp.close()
-            raise RuntimeError("key missing")
-
-        outfp.write("}\r\n")
-        outfp.close()
-        global GD_CNT
-        GD_CNT += 1
-        log(SUCCESS, f"[{GD_CNT:02d}] {xls_file:{MAX_XLS_NAME_LEN}} => {gd_file_name}")
-        if meta["has_csv"]:
-            csv_sheet = excel["csv"][sheet_name]
-            if len(csv_sheet) > 0:
-                write_to_csv(csv_sheet, sheet_name, output_csv_path, xls_file)
-
-
-def write_to_gd_key(data, keys, type_dict, outfp, depth):
-    """Write to GDScript. Promary key style sheet."""
-    cnt = 0
-    key_x = keys[depth - 1]
-    indent = get_indent(depth)
-    prefix = (
-        ("{}:\r\n" + indent + "{{\r\n")
-        if type_dict[key_x] in (INT, FLOAT)
-        else ('"{}":\r\n' + indent + "{{\r\n")
+
+def read_float(value, vtype):
+    """Read float cell."""
+    return float(value) if vtype == XL_CELL_NUMBER else None
+
+
+def read_string(value, _):
+    """Read string cell."""
+    return format_str(value)
+
+
+def read_bool(value, vtype):
+    """Read boolean cell."""
+    if vtype != XL_CELL_BOOLEAN:
+        return None
+    return "true" if value == 1 else "false"
+
+
+def read_text(value, vtype):
+    """Read text cell, used by arrays, vectors and colors."""
+    return str(value) if vtype == XL_CELL_TEXT else None
+
+
+def read_gd(value, vtype):
+    """Read GDScript cell."""
+    if vtype in (XL_CELL_TEXT, XL_CELL_NUMBER):
+        return str(value)
+    return read_bool(value, vtype)
+
+
+def read_translate(value, vtype):
+    """Read translate cell."""
+    if vtype != XL_CELL_TEXT:
+        return None
+    return str(value).replace("\n", "\\n")
+
+
+class StringName(str):
+    """String written as StringName in binary output, like &"" in GDScript."""
+
+
+class Vector2(tuple):
+    """Vector2 of binary output."""
+
+
+class Vector3(tuple):
+    """Vector3 of binary output."""
+
+
+class Color(tuple):
+    """Color of binary output."""
+
+
+GD_ESCAPES = {
+    "n": "\n",
+    "t": "\t",
+    "r": "\r",
+    "a": "\a",
+    "b": "\b",
+    "f": "\f",
+    "v": "\v",
+    "\\": "\\",
+    '"': '"',
+    "'": "'",
+}
+
+
+def gd_unescape(s):
+    """Unescape a GDScript string literal body."""
+    if "\\" not in s:
+        return s
+    import re  # pylint: disable=import-outside-toplevel
+
+    return re.sub(
+        r"\\(u[0-9a-fA-F]{4}|.)",
+        lambda m: chr(int(m.group(1)[1:], 16))
+        if len(m.group(1)) == 5
+        else GD_ESCAPES.get(m.group(1), m.group(0)),
+        s,
     )
-    suffix_comma = "},\r\n"
-    suffix_end = "}\r\n"
 
-    prefix = indent + prefix
-    suffix_comma = indent + suffix_comma
-    suffix_end = indent + suffix_end
 
-    for key, value in data.items():
-        outfp.write(prefix.format(key))
+def parse_number(s):
+    """Parse a GDScript number literal."""
+    s = s.strip().replace("_", "")
+    try:
+        if s.lstrip("+-")[:2].lower() in ("0x", "0b"):
+            return int(s, 0)
+        return int(s)
+    except ValueError:
+        pass
+    try:
+        return float(s)
+    except ValueError as err:
+        raise RuntimeError(
+            f'"{s}" is not a number, use the "{MODE_GD}" output mode'
+        ) from err
+
+
+def split_values(v):
+    """Split values of an array cell, empty values are skipped."""
+    return [x for x in v.split(",") if x is not None and x != ""]
+
+
+def var_value(v):
+    """Get binary value of int, float and gdscript."""
+    return v
+
+
+def var_string(v):
+    """Get binary value of string."""
+    if v is None:
+        return None
+    return StringName(gd_unescape(v.strip()))
+
+
+def var_bool(v):
+    """Get binary value of boolean."""
+    if v is None:
+        return None
+    return v == "true"
+
+
+def var_number_arr(v):
+    """Get binary value of interger or float array."""
+    if v is None:
+        return None
+    return [parse_number(x) for x in split_values(v)]
+
+
+def var_string_arr(v):
+    """Get binary value of string array."""
+    if v is None:
+        return None
+    return [StringName(gd_unescape(x.strip())) for x in split_values(v)]
+
+
+def var_bool_arr(v):
+    """Get binary value of boolean array."""
+    if v is None:
+        return None
+    values = [x.strip().lower() for x in split_values(v)]
+    if any(x not in ("true", "false") for x in values):
+        raise RuntimeError(f'"{v}" is not a bool array')
+    return [x == "true" for x in values]
+
+
+def var_vector(cls, size):
+    """Get binary value function of Vector2, Vector3 and Color."""
+
+    def var_vec(v):
+        if v is None or len(v.split(",")) != size:
+            return None
+        values = [float(parse_number(x)) for x in split_values(v)]
+        if len(values) != size:
+            raise RuntimeError(f'"{v}" is not a {cls.__name__}')
+        return cls(values)
+
+    return var_vec
+
+
+# 类型注册表 type name: (cell reader, GDScript getter, binary value)
+TYPE_REGISTRY = {
+    INT: (read_int, get_int, var_value),
+    FLOAT: (read_float, get_float, var_value),
+    STRING: (read_string, get_string, var_string),
+    BOOL: (read_bool, get_bool, var_bool),
+    INT_ARR: (read_text, get_int_arr, var_number_arr),
+    FLOAT_ARR: (read_text, get_float_arr, var_number_arr),
+    STRING_ARR: (read_string, get_string_arr, var_string_arr),
+    BOOL_ARR: (read_text, get_bool_arr, var_bool_arr),
+    VECTOR2: (read_text, get_vector2, var_vector(Vector2, 2)),
+    VECTOR3: (read_text, get_vector3, var_vector(Vector3, 3)),
+    COLOR: (read_text, get_color, var_vector(Color, 4)),
+    # GDScript can not be stored in binary, it is kept in the loader
+    GDSCRIPT: (read_gd, get_gd, None),
+    TRANSLATE: (read_translate, get_translate, var_string),
+    COMMENT: (None, None, None),
+}
+
+
+def get_repeated_strings(table, index, depth, type_dict):
+    """Get strings which are used more than once in string columns."""
+    cols = [
+        (pos, type_dict[k] == STRING_ARR)
+        for pos, k in enumerate(table.columns)
+        if type_dict[k] in (STRING, TRANSLATE, STRING_ARR)
+    ]
+    counts = collections.Counter()
+    for row_no in iter_index(index, depth):
+        row = table.rows[row_no]
+        for pos, is_arr in cols:
+            v = row[pos]
+            if v is None:
+                continue
+            if is_arr:
+                counts.update(x.strip() for x in v.split(",") if x != "")
+            else:
+                counts[v.strip()] += 1
+    return {s for s, n in counts.items() if n > 1}
+
+
+def make_intern_plan(col_plan, columns, type_dict, table, repeated, used):
+    """Make column plan of rows which refers to the string table _S.
+
+    Only repeated strings are in the table, and only when _S[n] is shorter.
+    The numbers of the referred strings are added to the set `used`.
+    """
+
+    def intern(s):
+        n = table.get(s)
+        if n is None:
+            if s not in repeated or len(s) + 3 <= len(f"_S[{len(table)}]"):
+                return '&"' + s + '"'
+            n = table[s] = len(table)
+        used.add(n)
+        return f"_S[{n}]"
+
+    def get_string_interned(v):
+        if v is None:
+            return "null"
+        return intern(v.strip())
+
+    def get_string_arr_interned(v):
+        if v is None:
+            return "null"
+        return "[" + ", ".join(intern(x.strip()) for x in v.split(",") if x != "") + "]"
+
+    getters = {
+        STRING: get_string_interned,
+        TRANSLATE: get_string_interned,
+        STRING_ARR: get_string_arr_interned,
+    }
+    return [
+        (prefix, getters.get(type_dict[k], get_value))
+        for k, (prefix, get_value) in zip(columns, col_plan)
+    ]
+
+
+def get_string_table(name, table):
+    """Get the GDScript const of a string table."""
+    entries = "".join(f'\t&"{s}",\r\n' for s in table)
+    return f"const {name} = [\r\n{entries}]\r\n"
+
+
+def write_to_gd_key(table, index, keys, type_dict, chunks, depth, col_plan=None):
+    """Write to GDScript. Promary key style sheet.
+
+    The output is appended to `chunks`.
+    The column plan of rows is built once and passed down.
+    """
+    if col_plan is None:
+        col_plan = make_col_plan(table.columns, type_dict, len(keys) + 1)
+    key_x = keys[depth - 1]
+    indent = get_indent(depth)
+    is_number = type_dict[key_x] in (INT, FLOAT)
+    prefix_open = f":\r\n{indent}{{\r\n"
+    suffix_comma = indent + "},\r\n"
+    suffix_end = indent + "}\r\n"
+
+    cnt, last = 0, len(index)
+    for key, value in index.items():
+        if is_number:
+            chunks.append(f"{indent}{key}{prefix_open}")
+        else:
+            chunks.append(f'{indent}"{key}"{prefix_open}')
         if depth == len(keys):
-            write_to_gd_row(value, type_dict, outfp, depth + 1)
+            write_to_gd_row(table.rows[value], chunks, col_plan)
         else:
-            write_to_gd_key(value, keys, type_dict, outfp, depth + 1)
+            write_to_gd_key(
+                table, value, keys, type_dict, chunks, depth + 1, col_plan
+            )
         cnt += 1
-        outfp.write(suffix_end if cnt == len(data) else suffix_comma)
+        chunks.append(suffix_end if cnt == last else suffix_comma)
 
 
-def write_to_gd_row(row, type_dict, outfp, depth):
-    """Write to GDScript. Row style sheet."""
-    cnt = 0
+def make_col_plan(columns, type_dict, depth):
+    """Make column plan of rows: prefix and getter of each column."""
     indent = get_indent(depth)
-    template = '{}"{}": {}'
-    for key, value in row.items():
-        if type_dict[key] == INT:
-            outfp.write(template.format(indent, key, get_int(value)))
-        elif type_dict[key] == FLOAT:
-            outfp.write(template.format(indent, key, get_float(value)))
-        elif type_dict[key] == STRING:
-            outfp.write(template.format(indent, key, get_string(value)))
-        elif type_dict[key] == BOOL:
-            outfp.write(template.format(indent, key, get_bool(value)))
-        elif type_dict[key] == INT_ARR:
-            outfp.write(template.format(indent, key, get_int_arr(value)))
-        elif type_dict[key] == FLOAT_ARR:
-            outfp.write(template.format(indent, key, get_float_arr(value)))
-        elif type_dict[key] == STRING_ARR:
-            outfp.write(template.format(indent, key, get_string_arr(value)))
-        elif type_dict[key] == BOOL_ARR:
-            outfp.write(template.format(indent, key, get_bool_arr(value)))
-        elif type_dict[key] == VECTOR2:
-            outfp.write(template.format(indent, key, get_vector2(value)))
-        elif type_dict[key] == VECTOR3:
-            outfp.write(template.format(indent, key, get_vector3(value)))
-        elif type_dict[key] == COLOR:
-            outfp.write(template.format(indent, key, get_color(value)))
-        elif type_dict[key] == GDSCRIPT:
-            outfp.write(template.format(indent, key, get_gd(value)))
-        elif type_dict[key] == TRANSLATE:
-            outfp.write(template.format(indent, key, get_translate(value)))
-        else:
-            outfp.close()
-            raise RuntimeError(f'key "{key}" type "{type_dict[key]}" is wrong')
-
-        cnt += 1
-        if cnt == len(row):
-            outfp.write("\r\n")
-        else:
-            outfp.write(",\r\n")
+    col_plan = []
+    for k in columns:
+        get_value = TYPE_REGISTRY.get(type_dict[k], (None, None))[1]
+        if get_value is None:
+            raise RuntimeError(f'key "{k}" type "{type_dict[k]}" is wrong')
+        col_plan.append((f'{indent}"{k}": ', get_value))
+    return col_plan
+
+
+def write_to_gd_row(row, chunks, col_plan):
+    """Write to GDScript. Row style sheet, row is a tuple in column order."""
+    chunks.append(
+        ",\r\n".join(
+            f"{prefix}{get_value(value)}"
+            for (prefix, get_value), value in zip(col_plan, row)
+        )
+    )
+    chunks.append("\r\n")
 
 
-def write_to_gd_kv(data, keys, type_dict, outfp, depth):
+def write_to_gd_kv(table, keys, type_dict, chunks, depth):
     """Write to GDScript. Key-value style sheet."""
     cnt = 0
     key_x = keys[depth - 1]
@@ -614,9 +1282,9 @@ def write_to_gd_kv(data, keys, type_dict, outfp, depth):
 
     prefix = indent + prefix
 
-    for _, kv in data.items():
+    for row_no in table.index.values():
         key, value = None, None
-        for k, v in kv.items():
+        for k, v in zip(table.columns, table.rows[row_no]):
             if type_dict[k] == INT and k.lower() == "key":
                 key = get_int(v)
             elif type_dict[k] == FLOAT and k.lower() == "key":
@@ -629,167 +1297,1378 @@ def write_to_gd_kv(data, keys, type_dict, outfp, depth):
                 raise RuntimeError("kv excel format is wrong")
 
         if not (key and value):
-            outfp.close()
             raise RuntimeError("kv excel format is wrong")
 
-        outfp.write(prefix.format(key))
-        outfp.write(value)
         cnt += 1
-        outfp.write(suffix_end if cnt == len(data) else suffix_comma)
+        chunks.append(prefix.format(key))
+        chunks.append(value)
+        chunks.append(suffix_end if cnt == len(table.index) else suffix_comma)
+
+
+def get_packed_str(v):
+    """Get string of a packed string array."""
+    if v is None:
+        return '""'
+    return '"' + v.strip() + '"'
+
+
+def get_packed_bool(v):
+    """Get boolean of a packed byte array."""
+    return "1" if v == "true" else "0"
+
+
+def get_packed_vector(default, get_value):
+    """Get packed vector function, null is replaced by the default value."""
+
+    def get_packed(v):
+        value = get_value(v)
+        return default if value == "null" else value
+
+    return get_packed
+
+
+# 列存储类型 type name: (packed array, GDScript type, packed value getter)
+# 其他类型写成 Array
+PACKED_TYPES = {
+    INT: ("PackedInt32Array", "int", lambda v: 0 if v is None else v),
+    FLOAT: ("PackedFloat64Array", "float", lambda v: 0.0 if v is None else v),
+    STRING: ("PackedStringArray", "String", get_packed_str),
+    TRANSLATE: ("PackedStringArray", "String", get_packed_str),
+    BOOL: ("PackedByteArray", "bool", get_packed_bool),
+    VECTOR2: (
+        "PackedVector2Array",
+        "Vector2",
+        get_packed_vector("Vector2()", get_vector2),
+    ),
+    VECTOR3: (
+        "PackedVector3Array",
+        "Vector3",
+        get_packed_vector("Vector3()", get_vector3),
+    ),
+    COLOR: ("PackedColorArray", "Color", get_packed_vector("Color()", get_color)),
+}
+
+
+def write_to_gd_columns(table, sheet_name, keys, type_dict, chunks):
+    """Write to GDScript. Column style, each column is a packed array.
+
+    Rows are found by keys in an index of row numbers, and read with the
+    typed accessors. Empty cells of packed columns are 0, "" or false.
+    """
+    import re  # pylint: disable=import-outside-toplevel
+
+    # rows are written in key order, which may differ from the sheet order
+    order = list(iter_index(table.index, len(keys)))
+    row_pos = [0] * len(table.rows)
+    for n, row_no in enumerate(order):
+        row_pos[row_no] = n
+    rows = [table.rows[row_no] for row_no in order]
+
+    chunks.append(f"# {sheet_name} is stored by columns, use find() to get a row\r\n")
+    chunks.append(f"const ROW_COUNT = {len(rows)}\r\n")
+    chunks.append("const _INDEX = {\r\n")
+    write_to_gd_index(table.index, keys, type_dict, chunks, 1, row_pos)
+    chunks.append("}\r\n")
+
+    accessors = []
+    for pos, title in enumerate(table.columns):
+        col_type = type_dict[title]
+        name = re.sub(r"\W", "_", title)
+        if col_type in PACKED_TYPES:
+            packed, gd_type, get_value = PACKED_TYPES[col_type]
+            values = [get_value(row[pos]) for row in rows]
+            if col_type == INT and any(not -(1 << 31) <= v < (1 << 31) for v in values):
+                packed = "PackedInt64Array"
+            chunks.append(f"static var {name} := {packed}([")
+        else:
+            gd_type, get_value = "Variant", TYPE_REGISTRY[col_type][1]
+            values = [get_value(row[pos]) for row in rows]
+            chunks.append(f"static var {name}: Array = [")
+        chunks.append(", ".join(map(str, values)))
+        chunks.append("])\r\n" if col_type in PACKED_TYPES else "]\r\n")
+        value = f"{name}[row] != 0" if col_type == BOOL else f"{name}[row]"
+        accessors.append(
+            f"\r\n\r\nstatic func get_{name}(row: int) -> {gd_type}:\r\n"
+            f"\treturn {value}\r\n"
+        )
+
+    args = ", ".join(f"key{n + 1}: Variant" for n in range(len(keys)))
+    chunks.append(
+        f"\r\n\r\nstatic func find({args}) -> int:\r\n"
+        "\tvar index: Variant = _INDEX\r\n"
+        f"\tfor key in [{', '.join(f'key{n + 1}' for n in range(len(keys)))}]:\r\n"
+        "\t\tindex = index.get(key)\r\n"
+        "\t\tif index == null:\r\n"
+        "\t\t\treturn -1\r\n"
+        "\treturn index\r\n"
+    )
+    chunks.extend(accessors)
 
 
-def write_to_csv(sheet, sheet_name, output_csv_path, xls_file):
-    """Export to CSV."""
-    csv_file_name = OUTPUT_CSV_NAME_TEMPLATE.format(sheet_name=sheet_name)
-    csv_file_fullpath = output_csv_path + "/" + csv_file_name
-    filenames = ["id", DEFAULT_LANG]
-    data_csv = {}
+def write_to_gd_index(index, keys, type_dict, chunks, depth, row_pos):
+    """Write the key index of a column style sheet, from keys to row numbers.
+
+    `row_pos` maps row numbers of the table to the written rows.
+    """
+    indent = get_indent(depth)
+    is_number = type_dict[keys[depth - 1]] in (INT, FLOAT)
+    for key, value in index.items():
+        key = key if is_number else f'"{key}"'
+        if depth == len(keys):
+            chunks.append(f"{indent}{key}: {row_pos[value]},\r\n")
+        else:
+            chunks.append(f"{indent}{key}: {{\r\n")
+            write_to_gd_index(value, keys, type_dict, chunks, depth + 1, row_pos)
+            chunks.append(f"{indent}}},\r\n")
+
+
+def count_rows(index, depth):
+    """Count rows under nested keys."""
+    if depth == 0:
+        return 1
+    return sum(count_rows(v, depth - 1) for v in index.values())
+
+
+def write_to_gd_loader(table, sheet_name, keys, type_dict, bin_file, chunks):
+    """Write the GDScript loader of a binary sheet.
+
+    The sheet is loaded into a static var with the same name as the const
+    of the gd output mode. GDScript columns are kept here as a const,
+    and merged into the loaded rows.
+    """
+    gd_cols = [k for k in table.columns if type_dict[k] == GDSCRIPT]
+    chunks.append(f"static var {sheet_name}: Dictionary = _load()\r\n\r\n")
+    if gd_cols:
+        chunks.append("const _GD = {\r\n")
+        gd_table = select_columns(table, gd_cols)
+        write_to_gd_key(gd_table, gd_table.index, keys, type_dict, chunks, 1)
+        chunks.append("}\r\n\r\n")
+        chunks.append(
+            "static func _merge(data: Dictionary, gd: Dictionary, depth: int) -> void:\r\n"
+            "\tfor key in gd:\r\n"
+            "\t\tif depth > 1:\r\n"
+            "\t\t\t_merge(data[key], gd[key], depth - 1)\r\n"
+            "\t\telse:\r\n"
+            "\t\t\tdata[key].merge(gd[key], true)\r\n\r\n"
+        )
+    chunks.append(
+        "static func _load() -> Dictionary:\r\n"
+        f'\tvar bytes := FileAccess.get_file_as_bytes("{get_res_path(bin_file)}")\r\n'
+        "\tvar data: Dictionary = bytes_to_var(bytes)\r\n"
+    )
+    if gd_cols:
+        chunks.append(f"\t_merge(data, _GD, {len(keys)})\r\n")
+    chunks.append("\treturn data\r\n")
+
+
+def get_sheet_var(table, keys, type_dict, is_kv):
+    """Get binary value of a sheet, the same data as the GDScript const."""
+    if is_kv:
+        get_key = var_string if type_dict[keys[0]] == STRING else lambda v: [v]
+        values = {}
+        for row_no in table.index.values():
+            key = value = None
+            for k, v in zip(table.columns, table.rows[row_no]):
+                if k.lower() == "key":
+                    key = get_key(v)
+                elif k.lower() == "value":
+                    value = var_string(v)
+            if key is None or value is None:
+                raise RuntimeError("kv excel format is wrong")
+            # [1] as a key is an array in GDScript
+            values[tuple(key) if isinstance(key, list) else key] = value
+        return values
+
+    col_vars = [(k, TYPE_REGISTRY[type_dict[k]][2]) for k in table.columns]
 
-    if os.path.isfile(csv_file_fullpath):
-        # read old csv
-        with open(csv_file_fullpath, encoding="utf-8", newline="") as f:
-            r = csv.DictReader(f)
-            filenames = r.fieldnames
+    def get_rows(index, depth):
+        if depth == len(keys):
+            return {
+                key: {
+                    k: var(v) if var else None
+                    for (k, var), v in zip(col_vars, table.rows[row_no])
+                }
+                for key, row_no in index.items()
+            }
+        return {key: get_rows(value, depth + 1) for key, value in index.items()}
+
+    return get_rows(table.index, 1)
+
+
+def var_to_bytes(value):
+    """Encode a value like var_to_bytes() of Godot 4."""
+    out = bytearray()
+    encode_var(value, out)
+    return bytes(out)
+
+
+# Godot 4 Variant types
+VAR_NIL, VAR_BOOL, VAR_INT, VAR_FLOAT, VAR_STRING = 0, 1, 2, 3, 4
+VAR_VECTOR2, VAR_VECTOR3, VAR_COLOR, VAR_STRING_NAME = 5, 9, 20, 21
+VAR_DICTIONARY, VAR_ARRAY = 27, 28
+VAR_FLAG_64 = 1 << 16
+
+
+def encode_var(value, out):
+    """Encode a value into out."""
+    if value is None:
+        out += struct.pack("<I", VAR_NIL)
+    elif isinstance(value, bool):
+        out += struct.pack("<Ii", VAR_BOOL, int(value))
+    elif isinstance(value, int):
+        if -(1 << 31) <= value < (1 << 31):
+            out += struct.pack("<Ii", VAR_INT, value)
+        else:
+            out += struct.pack("<Iq", VAR_INT | VAR_FLAG_64, value)
+    elif isinstance(value, float):
+        out += struct.pack("<Id", VAR_FLOAT | VAR_FLAG_64, value)
+    elif isinstance(value, str):
+        data = value.encode("utf-8")
+        var_type = VAR_STRING_NAME if isinstance(value, StringName) else VAR_STRING
+        out += struct.pack("<II", var_type, len(data))
+        out += data
+        out += b"\0" * (-len(data) % 4)
+    elif isinstance(value, Vector2):
+        out += struct.pack("<I2f", VAR_VECTOR2, *value)
+    elif isinstance(value, Vector3):
+        out += struct.pack("<I3f", VAR_VECTOR3, *value)
+    elif isinstance(value, Color):
+        out += struct.pack("<I4f", VAR_COLOR, *value)
+    elif isinstance(value, dict):
+        out += struct.pack("<II", VAR_DICTIONARY, len(value))
+        for k, v in value.items():
+            encode_var(list(k) if isinstance(k, tuple) else k, out)
+            encode_var(v, out)
+    elif isinstance(value, (list, tuple)):
+        out += struct.pack("<II", VAR_ARRAY, len(value))
+        for v in value:
+            encode_var(v, out)
+    else:
+        raise RuntimeError(f"{type(value).__name__} can not be encoded")
+
+
+def get_res_path(filename):
+    """Get the res:// path of a file, by finding project.godot in its parents."""
+    path = os.path.abspath(filename)
+    folder = os.path.dirname(path)
+    while not os.path.isfile(os.path.join(folder, "project.godot")):
+        parent = os.path.dirname(folder)
+        if parent == folder:
+            raise RuntimeError(
+                f"project.godot not found above {filename}, "
+                f'the "{MODE_BIN}" output mode needs it'
+            )
+        folder = parent
+    return "res://" + os.path.relpath(path, folder).replace(os.sep, "/")
+
+
+def merge_csv(filename, sheet):
+    """Merge strings of DEFAULT_LANG into a locale CSV in one pass.
+
+    Other language columns and the row order are kept,
+    changed strings are updated in place, new ids are appended.
+    """
+    import csv  # pylint: disable=import-outside-toplevel
+
+    pending = dict(sheet)
+    header = ["id", DEFAULT_LANG]
+    rows = []
+    if os.path.isfile(filename):
+        with open(filename, encoding="utf-8", newline="") as f:
+            r = csv.reader(f)
+            header = next(r, None) or header
+            if "id" not in header or DEFAULT_LANG not in header:
+                raise RuntimeError(f"{filename} needs id and {DEFAULT_LANG} columns")
+            id_idx, lang_idx = header.index("id"), header.index(DEFAULT_LANG)
+            seen = set()
             for row in r:
-                data_csv[row["id"]] = row
+                if not row:
+                    continue
+                if len(row) < len(header):
+                    row.extend([""] * (len(header) - len(row)))
+                key = row[id_idx]
+                if key in seen:
+                    continue
+                seen.add(key)
+                value = pending.pop(key, None)
+                if value is not None:
+                    row[lang_idx] = value
+                rows.append(row)
+    else:
+        id_idx, lang_idx = 0, 1
+
+    for key, value in pending.items():
+        row = [""] * len(header)
+        row[id_idx] = key
+        row[lang_idx] = value
+        rows.append(row)
+
+    with io.StringIO(newline="") as f:
+        w = csv.writer(f, quotechar='"')
+        w.writerow(header)
+        w.writerows(rows)
+        return f.getvalue()
 
-    # update data_csv
-    for key, value in sheet.items():
-        if data_csv.get(key) is None:
-            data_csv[key] = {}
-        data_csv[key]["id"] = key
-        data_csv[key][DEFAULT_LANG] = value
 
-    # write new csv
-    with open(csv_file_fullpath, "w", encoding="utf-8", newline="") as f:
-        w = csv.DictWriter(f, filenames, quotechar='"')
-        w.writeheader()
-        for row in data_csv.values():
-            w.writerow(row)
-        log(SUCCESS, f"[{GD_CNT:02d}] {xls_file:{MAX_XLS_NAME_LEN}} => {csv_file_name}")
+def get_locale_digest(sheet):
+    """Get digest of the ids and strings of a locale sheet."""
+    import hashlib  # pylint: disable=import-outside-toplevel
+
+    h = hashlib.sha1()
+    for key, value in sheet.items():
+        h.update(f"{key}\0{value}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+def get_stat(filename):
+    """Get size and mtime of a file."""
+    stat = os.stat(filename)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def write_file(filename, content):
+    """Write bytes to a file unless it is identical.
+
+    The file is replaced atomically through a temp file.
+    Return True if written, False if unchanged.
+    """
+    import hashlib  # pylint: disable=import-outside-toplevel
+
+    if os.path.isfile(filename) and os.path.getsize(filename) == len(content):
+        with open(filename, "rb") as f:
+            old_hash = hashlib.sha1(f.read()).digest()
+        if old_hash == hashlib.sha1(content).digest():
+            return False
+    tmp_filename = filename + ".tmp"
+    with open(tmp_filename, "wb") as f:
+        f.write(content)
+    os.replace(tmp_filename, filename)
+    return True
+
+
+def remove_shards(gd_file, sheet_name, count):
+    """Remove the shards of a sheet numbered from `count` on.
+
+    They are left by a run that split the sheet into more shards, or by a
+    sharded run if `count` is 0. A file is a shard of the sheet only if it is
+    named <stem>_<n><ext> and it defines the const of the sheet, so the
+    output of another sheet named like <sheet>_<n> is kept.
+    """
+    stem, ext = os.path.splitext(gd_file)
+    folder, prefix = os.path.split(stem)
+    prefix += "_"
+    for entry in os.scandir(folder or "."):
+        name = entry.name
+        if not (name.startswith(prefix) and name.endswith(ext)):
+            continue
+        n = name[len(prefix) : len(name) - len(ext)]
+        if not n.isdigit() or int(n) < count:
+            continue
+        try:
+            with open(entry.path, encoding="utf-8") as f:
+                if f"const {sheet_name} = {{" not in f.read():
+                    continue
+            os.remove(entry.path)
+            # Godot 4.4+ 为脚本生成的 uid 文件
+            if os.path.isfile(entry.path + ".uid"):
+                os.remove(entry.path + ".uid")
+        except (OSError, UnicodeDecodeError):
+            continue
 
 
 def get_indent(depth):
     """Get indent."""
-    indent = ""
-    for _ in range(depth):
-        indent += "\t"
-    return indent
-
-
-def check_config():
-    """Check config file."""
-    if not os.path.isfile(CONFIG_FILE):
-        default_config = {
-            "input_folder": INPUT_FOLDER,
-            "output_gd_folder": OUTPUT_GD_FOLDER,
-            "output_gd_name_template": OUTPUT_GD_NAME_TEMPLATE,
-            "output_csv_folder": OUTPUT_CSV_FOLDER,
-            "output_csv_name_template": OUTPUT_CSV_NAME_TEMPLATE,
+    return "\t" * depth
+
+
+class Converter:
+    """A conversion with its own config, counters, logs and results.
+
+    Converters share no state, so several of them can run in one process,
+    in threads or not. Logs go to `sink`, a LogSink. `progress` is called as
+    progress(xls_file, sheet_name, done, total, rows_per_sec), and setting
+    the `cancel` event stops the conversion between sheets.
+    Without `config_file` the config is only the one given. Without
+    `manifest_file` the manifest is kept in memory only, so each Converter
+    has its own, and the first run converts every workbook. With an
+    `executor`, workbooks are converted in that process pool, which is kept
+    warm between runs, instead of a new pool of `jobs` processes.
+    The config file and the manifest are kept in memory between runs, and
+    read again only if they are changed on disk.
+    With a TableCache `cache`, parsed workbooks are saved to it, and a
+    workbook parsed before is loaded from it instead of being parsed again.
+    """
+
+    def __init__(
+        self,
+        config=None,
+        jobs=1,
+        force=False,
+        metrics_file=None,
+        profile_folder=None,
+        sink=None,
+        progress=None,
+        cancel=None,
+        config_file=None,
+        manifest_file=None,
+        executor=None,
+        cache=None,
+    ):
+        self.set_config(dict(DEFAULT_CONFIG, **(config or {})))
+        self.jobs = jobs
+        self.force = force
+        self.metrics_file = metrics_file
+        self.profile_folder = profile_folder
+        self.sink = sink or LogSink(write_console, LOG_FLUSH_INTERVAL)
+        self.progress = progress
+        self.cancel = cancel or threading.Event()
+        self.config_file = config_file
+        self.manifest_file = manifest_file
+        self.executor = executor
+        self.cache = cache
+        # 常驻进程里不重复读取未修改的文件
+        self.config_stat = None
+        self.manifest = None
+        self.manifest_stat = None
+        self.gd_cnt = 0
+        self.written_cnt = 0
+        self.unchanged_cnt = 0
+        self.max_xls_name_len = 0
+        self.metrics = {}
+        self.locale_index = {}
+        self.string_table = {}
+        self.progress_state = {
+            "xls_file": "",
+            "done": 0,
+            "total": 0,
+            "rows": 0,
+            "start": 0.0,
+        }
+        # 每个文件的结果: outputs, converted, errors
+        self.results = {}
+        # 子进程里保留输出记录, 由主进程重放
+        self.records = None
+
+    def run(self, check=False):
+        """Load the config file if any, then convert or check. Return the result.
+
+        Errors are logged and kept in the result, they are not raised.
+        """
+        import datetime  # pylint: disable=import-outside-toplevel
+
+        self.results = {}
+        error = None
+        try:
+            self.log(INFO, f"time: \t\t{datetime.datetime.now()}")
+            if self.config_file:
+                self.load_config()
+            if check:
+                if self.check() == 0:
+                    self.log(INFO, "done.")
+            else:
+                self.main()
+                self.log_summary()
+        except ConvertCancelled as err:
+            error = str(err)
+            self.log(INFO, f"{err}.")
+        except (
+            RuntimeError,
+            ValueError,
+            SyntaxError,
+            AssertionError,
+            PermissionError,
+        ) as err:
+            error = format_error(err)
+            self.log(ERROR, error)
+        finally:
+            self.sink.flush()
+        return self.get_result(error)
+
+    def get_result(self, error=None):
+        """Get the result of the last run.
+
+        `files` maps each workbook to its outputs, if it is converted in this
+        run, and its errors as (sheet, row, column, message).
+        """
+        return {
+            "error": error,
+            "files": self.results,
+            "gd_cnt": self.gd_cnt,
+            "written_cnt": self.written_cnt,
+            "unchanged_cnt": self.unchanged_cnt,
+            "error_cnt": sum(len(x["errors"]) for x in self.results.values()),
+            "metrics": self.metrics,
         }
-        with open(CONFIG_FILE, "w", encoding="utf-8") as json_file:
-            json_file.write(json.dumps(default_config, indent=True))
-            json_file.close()
-            subprocess.check_call(["attrib", "+H", CONFIG_FILE])
-            log(INFO, f"generate config at {CONFIG_FILE}")
 
+    def set_result(self, xls_file, outputs, converted, errors=()):
+        """Keep the result of a workbook."""
+        self.results[xls_file] = {
+            "outputs": list(outputs),
+            "converted": converted,
+            "errors": list(errors),
+        }
 
-def load_config():
-    """Load config file."""
-    check_config()
-    log(INFO, f"load config from \t{CONFIG_FILE}")
+    def check_config(self):
+        """Check config file."""
+        if not os.path.isfile(self.config_file):
+            import subprocess  # pylint: disable=import-outside-toplevel
+
+            default_config = self.get_config()
+            with open(self.config_file, "w", encoding="utf-8") as json_file:
+                json_file.write(json.dumps(default_config, indent=True))
+                json_file.close()
+                subprocess.check_call(["attrib", "+H", self.config_file])
+                self.log(INFO, f"generate config at {self.config_file}")
+
+    def load_config(self):
+        """Load config file, unless it is the same as the loaded one."""
+        self.check_config()
+        stat = get_stat(self.config_file)
+        if stat == self.config_stat:
+            return
+        self.log(INFO, f"load config from \t{self.config_file}")
+
+        with open(self.config_file, encoding="utf-8") as json_file:
+            config = json.load(json_file)
+            missing = [k for k in DEFAULT_CONFIG if k not in config]
+            if missing:
+                raise RuntimeError(
+                    f"{self.config_file} misses {', '.join(missing)}"
+                )
+            self.set_config(config)
+            json_file.close()
+        self.config_stat = stat
+
+    def get_config(self):
+        """Get current config."""
+        return {
+            "input_folder": self.input_folder,
+            "output_gd_folder": self.output_gd_folder,
+            "output_gd_name_template": self.output_gd_name_template,
+            "output_csv_folder": self.output_csv_folder,
+            "output_csv_name_template": self.output_csv_name_template,
+            "output_mode": self.output_mode,
+            "shard_rows": self.shard_rows,
+            "intern_strings": self.intern_strings,
+        }
 
-    with open(CONFIG_FILE, encoding="utf-8") as json_file:
-        config = json.load(json_file)
-        global INPUT_FOLDER, OUTPUT_GD_FOLDER, OUTPUT_GD_NAME_TEMPLATE, OUTPUT_CSV_FOLDER, OUTPUT_CSV_NAME_TEMPLATE
-        INPUT_FOLDER = config["input_folder"]
-        OUTPUT_GD_FOLDER = config["output_gd_folder"]
-        OUTPUT_GD_NAME_TEMPLATE = config["output_gd_name_template"]
-        OUTPUT_CSV_FOLDER = config["output_csv_folder"]
-        OUTPUT_CSV_NAME_TEMPLATE = config["output_csv_name_template"]
-        json_file.close()
+    def set_config(self, config):
+        """Set current config."""
+        self.input_folder = config["input_folder"]
+        self.output_gd_folder = config["output_gd_folder"]
+        self.output_gd_name_template = config["output_gd_name_template"]
+        self.output_csv_folder = config["output_csv_folder"]
+        self.output_csv_name_template = config["output_csv_name_template"]
+        # optional keys, older config files do not have them
+        self.output_mode = config.get("output_mode", MODE_GD)
+        if self.output_mode not in (MODE_GD, MODE_BIN, MODE_COLUMNS):
+            raise ValueError(f'output mode "{self.output_mode}" is wrong')
+        self.shard_rows = int(config.get("shard_rows", 0))
+        self.intern_strings = config.get("intern_strings", INTERN_OFF)
+        if self.intern_strings not in (INTERN_OFF, INTERN_SHEET, INTERN_RUN):
+            raise ValueError(f'intern strings "{self.intern_strings}" is wrong')
+
+    def save_config(self):
+        """Save config file."""
+        if not os.path.isfile(self.config_file):
+            return
+
+        config = self.get_config()
+        with open(self.config_file, "r+", encoding="utf-8") as json_file:
+            json_file.truncate(0)  # need '0' when using r+
+            json_file.write(json.dumps(config, indent=True))
+            json_file.close()
+            self.log(INFO, f"save config at {self.config_file}")
+
+    def main(self):
+        """Main function."""
+        self.gd_cnt, self.written_cnt, self.unchanged_cnt = 0, 0, 0
+        self.metrics = {}
+        input_path = self.input_folder
+        output_gd_path = self.output_gd_folder
+        output_csv_path = self.output_csv_folder
+        self.log(INFO, f"input path: \t{input_path}")
+        self.log(INFO, f"output *.gd path: \t{output_gd_path}")
+        self.log(INFO, f"output *.csv path: \t{output_csv_path}")
+        if not os.path.exists(input_path):
+            raise RuntimeError("input path does NOT exist.")
+        if not os.path.exists(output_gd_path):
+            os.mkdir(output_gd_path)
+            self.log(INFO, f"make a new dir: \t{output_gd_path}")
+        if not os.path.exists(output_csv_path):
+            os.mkdir(output_csv_path)
+            self.log(INFO, f"make a new dir: \t{output_csv_path}")
+
+        xls_files = os.listdir(input_path)
+        if len(xls_files) == 0:
+            raise RuntimeError("input dir is empty.")
+
+        # find max string len
+        self.max_xls_name_len = len(max(xls_files, key=len))
+
+        # filer files by .xls
+        xls_files = [x for x in xls_files if is_xls_file(x)]
+        self.log(INFO, f"total XLS: \t\t{len(xls_files)}")
+
+        manifest = self.load_manifest()
+        files = manifest["files"]
+        for xls_file in list(files):
+            if xls_file not in xls_files:
+                del files[xls_file]
+        self.convert_xls_files(xls_files, manifest)
+
+    def convert_xls_files(self, xls_files, manifest):
+        """Convert workbooks whose inputs changed, and update the manifest."""
+        self.locale_index = manifest.setdefault("locales", {})
+        if self.intern_strings == INTERN_RUN:
+            # 已转换的文件引用旧的序号, 字符串表只追加
+            self.string_table = {
+                s: n for n, s in enumerate(manifest.get("strings", []))
+            }
+        output_gd_path = self.output_gd_folder
+        output_csv_path = self.output_csv_folder
+        files = manifest["files"]
+        states = {}
+        dirty_files = []
+        for xls_file in xls_files:
+            record = files.get(xls_file)
+            state = get_file_state(f"{self.input_folder}/{xls_file}", record)
+            if is_up_to_date(record, state):
+                files[xls_file] = dict(state, outputs=record["outputs"])
+                self.set_result(xls_file, record["outputs"], False)
+            else:
+                states[xls_file] = state
+                dirty_files.append(xls_file)
+        if len(dirty_files) < len(xls_files):
+            self.log(INFO, f"unchanged XLS: \t{len(xls_files) - len(dirty_files)}")
+
+        self.progress_state.update(
+            xls_file="",
+            done=0,
+            total=len(dirty_files),
+            rows=0,
+            start=time.perf_counter(),
+        )
+        converted = {}
+        try:
+            # the shared string table is filled in order, so it is serial
+            if (
+                self.jobs > 1
+                and len(dirty_files) > 1
+                and not self.profile_folder
+                and self.intern_strings != INTERN_RUN
+            ):
+                self.convert_parallel(
+                    dirty_files, output_gd_path, output_csv_path, converted, states
+                )
+                return
+
+            for _, xls_file in enumerate(dirty_files):
+                self.check_cancel()
+                self.progress_state["xls_file"] = xls_file
+                self.report_progress()
+                with self.profile_workbook(xls_file):
+                    t, ret, err_str = self.load_table(
+                        xls_file, states[xls_file]["hash"]
+                    )
+                    if ret != 0:
+                        self.gd_cnt += 1
+                        self.log(FAILED, f"[{self.gd_cnt:02d}] {xls_file}")
+                        self.set_result(
+                            xls_file, [], False, [(None, None, None, err_str)]
+                        )
+                        raise RuntimeError(err_str)
+                    # print(json.dumps(t, indent=4))
+                    converted[xls_file] = self.write_to_gd_script(
+                        t, output_gd_path, output_csv_path, xls_file
+                    )
+                self.metrics[xls_file] = t["metrics"]
+                self.progress_state["done"] += 1
+                self.report_progress()
+        finally:
+            for xls_file, outputs in converted.items():
+                files[xls_file] = dict(states[xls_file], outputs=outputs)
+                self.set_result(xls_file, outputs, True)
+            if self.intern_strings == INTERN_RUN and self.string_table:
+                self.write_string_table()
+                manifest["strings"] = list(self.string_table)
+            self.save_manifest(manifest)
+            if self.cache is not None and dirty_files:
+                self.cache.evict()
+
+    def load_table(self, xls_file, file_hash):
+        """Make tables of a workbook, from the cache if it is parsed before."""
+        filename = f"{self.input_folder}/{xls_file}"
+        if self.cache is None:
+            return make_table(filename, conv=self)
+        excel = self.cache.load(file_hash, filename)
+        if excel is not None:
+            for sheet_name, sheet in excel["metrics"]["sheets"].items():
+                self.check_cancel()
+                self.report_progress(sheet_name, sheet["row_count"])
+            return excel, 0, "ok"
+        excel, ret, err_str = make_table(filename, conv=self)
+        if ret == 0:
+            self.cache.save(file_hash, excel)
+        return excel, ret, err_str
+
+    def convert_parallel(
+        self, xls_files, output_gd_path, output_csv_path, converted, states
+    ):
+        """Convert workbooks across a process pool.
+
+        Logs are replayed in input order, so the output is the same as a serial run.
+        A failed workbook does not stop the others.
+        The outputs of each converted workbook are stored in `converted`,
+        `states` are the file states of the workbooks, with the content hash.
+        """
+        import concurrent.futures  # pylint: disable=import-outside-toplevel
+
+        failed = []
+        jobs = min(self.jobs, len(xls_files))
+        config = self.get_config()
+        with self.get_executor(jobs) as executor:
+            futures = [
+                executor.submit(
+                    convert_workbook,
+                    config,
+                    self.locale_index,
+                    xls_file,
+                    output_gd_path,
+                    output_csv_path,
+                    self.cache,
+                    states[xls_file]["hash"],
+                )
+                for xls_file in xls_files
+            ]
+            for xls_file, future in zip(xls_files, futures):
+                if self.cancel.is_set():
+                    # running workbooks are finished, the others are dropped
+                    for x in futures:
+                        x.cancel()
+                    concurrent.futures.wait(futures)
+                    self.check_cancel()
+                try:
+                    result = future.result()
+                except Exception as err:  # pylint: disable=broad-except
+                    result = {"records": [], "error": format_error(err)}
+                for record in result["records"]:
+                    self.log_output(*record)
+                rows = 0
+                if result["error"] is None:
+                    converted[xls_file] = result["outputs"]
+                    self.metrics[xls_file] = result["metrics"]
+                    self.locale_index.update(result["locales"])
+                    rows = sum(
+                        m["row_count"] for m in result["metrics"]["sheets"].values()
+                    )
+                else:
+                    self.gd_cnt += 1
+                    self.log(FAILED, f"[{self.gd_cnt:02d}] {xls_file}")
+                    self.log(ERROR, result["error"])
+                    self.set_result(
+                        xls_file, [], False, [(None, None, None, result["error"])]
+                    )
+                    failed.append(xls_file)
+                self.progress_state["xls_file"] = xls_file
+                self.progress_state["done"] += 1
+                self.report_progress(rows=rows)
+
+        if failed:
+            raise RuntimeError(f"{len(failed)} XLS failed: {', '.join(failed)}")
+
+    @contextlib.contextmanager
+    def profile_workbook(self, xls_file):
+        """Profile a workbook conversion if `profile_folder` is set.
+
+        The CPU profile is saved as <profile_folder>/<xls_file>.pstats, and
+        the peak memory is logged, with the lines of this module that allocated
+        the most memory still held when the workbook is done.
+        """
+        if not self.profile_folder:
+            yield
+            return
+
+        import dis  # pylint: disable=import-outside-toplevel
+        import inspect  # pylint: disable=import-outside-toplevel
+        import cProfile  # pylint: disable=import-outside-toplevel
+        import tracemalloc  # pylint: disable=import-outside-toplevel
+
+        # 排除本函数的行, 例如 yield 所在行
+        code = inspect.currentframe().f_code
+        own_lines = {line for _, line in dis.findlinestarts(code)}
+        if not os.path.exists(self.profile_folder):
+            os.mkdir(self.profile_folder)
+        profiler = cProfile.Profile()
+        tracemalloc.start()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            pstats_file = f"{self.profile_folder}/{xls_file}.pstats"
+            profiler.dump_stats(pstats_file)
+            self.log(INFO, f"profile: \t\t{xls_file} => {pstats_file}")
+            self.log(INFO, f"peak memory: \t\t{peak / 1024 / 1024:.2f} MB")
+            # match by name, the path differs in the PyInstaller build
+            snapshot = snapshot.filter_traces(
+                [tracemalloc.Filter(True, "*tool_xls2gd.py")]
+            )
+            stats = [
+                stat
+                for stat in snapshot.statistics("lineno")
+                if stat.traceback[0].lineno not in own_lines
+            ]
+            for stat in stats[:PROFILE_TOP]:
+                frame = stat.traceback[0]
+                self.log(
+                    INFO,
+                    f"retained: \t\t{os.path.basename(frame.filename)}:{frame.lineno}"
+                    f" {stat.size / 1024:.1f} KB in {stat.count} blocks",
+                )
 
+    def watch(self):
+        """Watch the input folder and reconvert workbooks when they are saved.
+
+        A change is converted once the file stays the same for WATCH_DELAY,
+        so the temp files and partial saves of Excel are skipped.
+        """
+        import datetime  # pylint: disable=import-outside-toplevel
+
+        self.log(INFO, f"watching: \t\t{self.input_folder}")
+        # -f 只作用于启动时的转换, 监视时沿用它保存的清单
+        self.force = False
+        manifest = self.load_manifest()
+        known = scan_xls_files(self.input_folder)
+        pending = {}
+        try:
+            while True:
+                time.sleep(WATCH_INTERVAL)
+                now = time.monotonic()
+                current = scan_xls_files(self.input_folder)
+                for xls_file, state in current.items():
+                    if known.get(xls_file) == state:
+                        pending.pop(xls_file, None)
+                    elif xls_file not in pending or pending[xls_file][0] != state:
+                        pending[xls_file] = (state, now)
+                for xls_file in list(known):
+                    if xls_file not in current:
+                        del known[xls_file]
+                        manifest["files"].pop(xls_file, None)
+
+                ready = [
+                    x
+                    for x, (state, since) in pending.items()
+                    if now - since >= WATCH_DELAY and current.get(x) == state
+                ]
+                if not ready:
+                    continue
+                for xls_file in ready:
+                    known[xls_file] = pending.pop(xls_file)[0]
+                self.gd_cnt, self.written_cnt, self.unchanged_cnt = 0, 0, 0
+                self.metrics = {}
+                self.max_xls_name_len = len(max(ready, key=len))
+                self.log(INFO, f"time: \t\t{datetime.datetime.now()}")
+                try:
+                    self.convert_xls_files(sorted(ready), manifest)
+                    self.log_summary()
+                except Exception as err:  # pylint: disable=broad-except
+                    self.log(ERROR, format_error(err))
+        except KeyboardInterrupt:
+            self.log(INFO, "stop watching.")
+
+    def check(self):
+        """Check every workbook without writing any file, and log all errors.
+
+        Workbooks are checked across a process pool. Return the error count.
+        """
+        self.log(INFO, f"input path: \t{self.input_folder}")
+        if not os.path.exists(self.input_folder):
+            raise RuntimeError("input path does NOT exist.")
+        xls_files = [x for x in os.listdir(self.input_folder) if is_xls_file(x)]
+        if len(xls_files) == 0:
+            raise RuntimeError("input dir is empty.")
+        self.max_xls_name_len = len(max(xls_files, key=len))
+        self.log(INFO, f"total XLS: \t\t{len(xls_files)}")
+
+        jobs = min(self.jobs, len(xls_files))
+        config = self.get_config()
+        if jobs > 1:
+            with self.get_executor(jobs) as executor:
+                results = executor.map(
+                    check_workbook, itertools.repeat(config), xls_files
+                )
+                results = list(results)
+        else:
+            results = [check_workbook(config, xls_file) for xls_file in xls_files]
+
+        error_cnt, failed_cnt = 0, 0
+        for xls_file, errors in zip(xls_files, results):
+            self.set_result(xls_file, [], False, errors)
+            if not errors:
+                self.log(SUCCESS, xls_file)
+                continue
+            failed_cnt += 1
+            error_cnt += len(errors)
+            self.log(FAILED, f"{xls_file:{self.max_xls_name_len}} {len(errors)} errors")
+            for sheet, row, col, err_str in errors:
+                # file:sheet:row:column, like compilers
+                where = ":".join(str(x) for x in (xls_file, sheet, row, col) if x)
+                self.log(ERROR, f"{where} {err_str}")
+        self.log(INFO, f"failed XLS: \t\t{failed_cnt}")
+        self.log(INFO, f"total errors: \t\t{error_cnt}")
+        return error_cnt
+
+    def load_manifest(self):
+        """Load manifest file.
+
+        The manifest is reset if it is missing, broken, forced, or made with
+        another version, config or source of this module, so a changed parser
+        or emitter reconverts every workbook even if the version is the same.
+        """
+        manifest = None
+        if not self.force and not self.manifest_file:
+            manifest = self.manifest
+        elif not self.force and os.path.isfile(self.manifest_file):
+            if get_stat(self.manifest_file) == self.manifest_stat:
+                manifest = self.manifest
+            else:
+                try:
+                    with open(self.manifest_file, encoding="utf-8") as json_file:
+                        manifest = json.load(json_file)
+                except ValueError:
+                    manifest = None
+        if (
+            not isinstance(manifest, dict)
+            or manifest.get("version") != __version__
+            or manifest.get("source") != get_source_hash()
+            or manifest.get("config") != self.get_config()
+            or not isinstance(manifest.get("files"), dict)
+        ):
+            manifest = {
+                "version": __version__,
+                "source": get_source_hash(),
+                "config": self.get_config(),
+                "files": {},
+            }
+        return manifest
+
+    def save_manifest(self, manifest):
+        """Save manifest file, through a temp file so it is never half written."""
+        self.manifest = manifest
+        if not self.manifest_file:
+            return
+        content = json.dumps(manifest, indent=True).encode("utf-8")
+        write_file(self.manifest_file, content)
+        self.manifest_stat = get_stat(self.manifest_file)
+
+    @contextlib.contextmanager
+    def get_executor(self, jobs):
+        """Get the process pool of the converter, or a new one for this call."""
+        import concurrent.futures  # pylint: disable=import-outside-toplevel
+
+        if self.executor is not None:
+            yield self.executor
+            return
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+            yield executor
+
+    def write_to_gd_script(self, excel, output_gd_path, output_csv_path, xls_file):
+        """Write to GDScript. Return the output file paths."""
+        outputs = []
+        for sheet_name, sheet in excel["data"].items():
+            self.check_cancel()
+            meta = excel["meta"][sheet_name]
+            type_dict = meta["type_dict"]
+            key1 = meta[KEY_1] if KEY_1 in meta else None
+            key2 = meta[KEY_2] if KEY_2 in meta else None
+            key3 = meta[KEY_3] if KEY_3 in meta else None
+
+            metrics = excel["metrics"]["sheets"][sheet_name]
+            time_start = time.perf_counter()
+            gd_file_name = self.output_gd_name_template.format(sheet_name=sheet_name)
+            suffix = ""
+            gd_file_fullpath = output_gd_path + "/" + gd_file_name
+            chunks = []
+            chunks.append(SCRIPT_HEAD % (excel["filename"].replace(".//", "")))
+            keys = [k for k in (key1, key2, key3) if k]
+            if not key1:
+                raise RuntimeError("key missing")
+
+            shards = []
+            if self.output_mode == MODE_BIN:
+                bin_file_name = os.path.splitext(gd_file_name)[0] + ".bin"
+                bin_file_fullpath = output_gd_path + "/" + bin_file_name
+                is_kv = meta["kv"] and len(keys) == 1
+                content = var_to_bytes(get_sheet_var(sheet, keys, type_dict, is_kv))
+                bin_written = write_file(bin_file_fullpath, content)
+                write_to_gd_loader(
+                    sheet, sheet_name, keys, type_dict, bin_file_fullpath, chunks
+                )
+                metrics["gd_bytes"] = len(content)
+            elif self.output_mode == MODE_COLUMNS and not meta["kv"]:
+                write_to_gd_columns(sheet, sheet_name, keys, type_dict, chunks)
+                metrics["gd_bytes"] = 0
+            elif (
+                self.output_mode == MODE_GD
+                and self.shard_rows > 0
+                and not meta["kv"]
+                and metrics["row_count"] > self.shard_rows
+            ):
+                shards = self.write_to_gd_shards(
+                    sheet, sheet_name, keys, type_dict, gd_file_fullpath, chunks
+                )
+                metrics["gd_bytes"] = sum(size for _, _, _, size in shards)
+            elif not meta["kv"] or len(keys) > 1:
+                self.write_to_gd_const(
+                    sheet, sheet.index, sheet_name + suffix, keys, type_dict, chunks
+                )
+                metrics["gd_bytes"] = 0
+            else:
+                # key-value style sheet
+                chunks.append("const " + sheet_name + suffix + " = {\r\n")
+                write_to_gd_kv(sheet, [key1], type_dict, chunks, 1)
+                chunks.append("}\r\n")
+                metrics["gd_bytes"] = 0
+
+            content = "".join(chunks).encode("utf-8")
+            written = write_file(gd_file_fullpath, content)
+            metrics["gd"] = time.perf_counter() - time_start
+            metrics["gd_bytes"] += len(content)
+            self.log_output(xls_file, gd_file_name, written=written)
+            outputs.append(gd_file_fullpath)
+            if self.output_mode == MODE_BIN:
+                self.log_output(
+                    xls_file, bin_file_name, new_gd=False, written=bin_written
+                )
+                outputs.append(bin_file_fullpath)
+            for shard_file_name, shard_file_fullpath, shard_written, _ in shards:
+                self.log_output(
+                    xls_file, shard_file_name, new_gd=False, written=shard_written
+                )
+                outputs.append(shard_file_fullpath)
+            remove_shards(gd_file_fullpath, sheet_name, len(shards))
+            if meta["has_csv"]:
+                csv_sheet = excel["csv"][sheet_name]
+                if len(csv_sheet) > 0:
+                    time_start = time.perf_counter()
+                    csv_file_fullpath = self.write_to_csv(
+                        csv_sheet, sheet_name, output_csv_path, xls_file
+                    )
+                    metrics["csv"] = time.perf_counter() - time_start
+                    metrics["csv_bytes"] = os.path.getsize(csv_file_fullpath)
+                    outputs.append(csv_file_fullpath)
+        return outputs
+
+    def write_to_gd_const(self, table, index, const_name, keys, type_dict, chunks):
+        """Write rows of a key style sheet as a const, with its string table if needed.
+
+        `index` is the index of the table, or a part of it.
+        """
+        start = len(chunks)
+        col_plan = make_col_plan(table.columns, type_dict, len(keys) + 1)
+        strings = None
+        # 整次转换共用字符串表时, 其他表加入的字符串也会被引用
+        used = set()
+        if self.intern_strings != INTERN_OFF:
+            strings = self.string_table if self.intern_strings == INTERN_RUN else {}
+            repeated = get_repeated_strings(table, index, len(keys), type_dict)
+            col_plan = make_intern_plan(
+                col_plan, table.columns, type_dict, strings, repeated, used
+            )
+        chunks.append("const " + const_name + " = {\r\n")
+        write_to_gd_key(table, index, keys, type_dict, chunks, 1, col_plan)
+        chunks.append("}\r\n")
+        if self.intern_strings == INTERN_SHEET and strings:
+            chunks.insert(start, get_string_table("_S", strings))
+        elif self.intern_strings == INTERN_RUN and used:
+            path = get_res_path(self.get_string_table_file())
+            chunks.insert(start, f'const _S = preload("{path}").S\r\n')
+
+    def write_to_gd_shards(self, table, sheet_name, keys, type_dict, gd_file, chunks):
+        """Write a sheet as shards split by key1, and its index script to `chunks`.
+
+        A key1 is never split, so its rows are in one shard. The index script
+        loads a shard on the first lookup of its keys.
+        Return (file name, full path, written, size) of each shard.
+        """
+        groups, group, group_rows = [], {}, 0
+        for key, value in table.index.items():
+            rows = count_rows(value, len(keys) - 1)
+            if group and group_rows + rows > self.shard_rows:
+                groups.append(group)
+                group, group_rows = {}, 0
+            group[key] = value
+            group_rows += rows
+        groups.append(group)
+
+        shards = []
+        stem, ext = os.path.splitext(gd_file)
+        for n, group in enumerate(groups):
+            shard_file_fullpath = f"{stem}_{n}{ext}"
+            shard_chunks = [chunks[0]]
+            self.write_to_gd_const(
+                table, group, sheet_name, keys, type_dict, shard_chunks
+            )
+            content = "".join(shard_chunks).encode("utf-8")
+            written = write_file(shard_file_fullpath, content)
+            shard_file_name = os.path.basename(shard_file_fullpath)
+            shards.append((shard_file_name, shard_file_fullpath, written, len(content)))
+
+        # 数字主键且升序时按区间查找, 否则按索引表查找
+        is_number = type_dict[keys[0]] in (INT, FLOAT)
+        first_keys = [next(iter(group)) for group in groups]
+        all_keys = list(table.index)
+        is_range = is_number and all(a < b for a, b in zip(all_keys, all_keys[1:]))
+        key_literal = str if is_number else lambda k: f'"{k}"'
+
+        chunks.append(
+            f"# {sheet_name} is split into {len(groups)} shards by {keys[0]}\r\n"
+        )
+        chunks.append("const _SHARDS = [\r\n")
+        for _, shard_file_fullpath, _, _ in shards:
+            chunks.append(f'\t"{get_res_path(shard_file_fullpath)}",\r\n')
+        chunks.append("]\r\n")
+        if is_range:
+            chunks.append(
+                "const _FIRST_KEYS = ["
+                + ", ".join(key_literal(k) for k in first_keys)
+                + "]\r\n"
+            )
+        else:
+            chunks.append("const _INDEX = {\r\n")
+            for n, group in enumerate(groups):
+                for key in group:
+                    chunks.append(f"\t{key_literal(key)}: {n},\r\n")
+            chunks.append("}\r\n")
+        chunks.append("static var _loaded := {}\r\n\r\n\r\n")
+        chunks.append(
+            "static func get_row(key: Variant) -> Variant:\r\n"
+            "\tvar shard := _find_shard(key)\r\n"
+            "\tif shard < 0:\r\n"
+            "\t\treturn null\r\n"
+            "\treturn _load_shard(shard).get(key)\r\n\r\n\r\n"
+            "static func has_row(key: Variant) -> bool:\r\n"
+            "\tvar shard := _find_shard(key)\r\n"
+            "\treturn shard >= 0 and _load_shard(shard).has(key)\r\n\r\n\r\n"
+            "static func load_all() -> Dictionary:\r\n"
+            "\tvar data := {}\r\n"
+            "\tfor shard in _SHARDS.size():\r\n"
+            "\t\tdata.merge(_load_shard(shard))\r\n"
+            "\treturn data\r\n\r\n\r\n"
+            "static func _find_shard(key: Variant) -> int:\r\n"
+        )
+        if is_range:
+            chunks.append("\treturn _FIRST_KEYS.bsearch(key, false) - 1\r\n\r\n\r\n")
+        else:
+            chunks.append("\treturn _INDEX.get(key, -1)\r\n\r\n\r\n")
+        chunks.append(
+            "static func _load_shard(shard: int) -> Dictionary:\r\n"
+            "\tif not _loaded.has(shard):\r\n"
+            f"\t\t_loaded[shard] = load(_SHARDS[shard]).{sheet_name}\r\n"
+            "\treturn _loaded[shard]\r\n"
+        )
+        return shards
+
+    def get_string_table_file(self):
+        """Get the file path of the string table shared by the run."""
+        name = self.output_gd_name_template.format(sheet_name=STRING_TABLE_NAME)
+        return self.output_gd_folder + "/" + name
+
+    def write_string_table(self):
+        """Write the string table shared by the run."""
+        filename = self.get_string_table_file()
+        content = SCRIPT_HEAD % "*" + get_string_table("S", self.string_table)
+        written = write_file(filename, content.encode("utf-8"))
+        self.log_output("*", os.path.basename(filename), new_gd=False, written=written)
+
+    def write_to_csv(self, sheet, sheet_name, output_csv_path, xls_file):
+        """Export to CSV.
+
+        The file is skipped without reading it if both the file and the strings
+        are the same as in `locale_index`, which is kept in the manifest.
+        """
+        csv_file_name = self.output_csv_name_template.format(sheet_name=sheet_name)
+        csv_file_fullpath = output_csv_path + "/" + csv_file_name
+        digest = get_locale_digest(sheet)
+        index = self.locale_index.get(csv_file_fullpath)
 
-def save_config():
-    """Save config file."""
-    if not os.path.isfile(CONFIG_FILE):
-        return
+        if (
+            index is not None
+            and index["digest"] == digest
+            and os.path.isfile(csv_file_fullpath)
+            and get_stat(csv_file_fullpath) == [index["size"], index["mtime"]]
+        ):
+            written = False
+        else:
+            content = merge_csv(csv_file_fullpath, sheet)
+            written = write_file(csv_file_fullpath, content.encode("utf-8"))
+            size, mtime = get_stat(csv_file_fullpath)
+            self.locale_index[csv_file_fullpath] = {
+                "size": size,
+                "mtime": mtime,
+                "digest": digest,
+            }
+        self.log_output(xls_file, csv_file_name, new_gd=False, written=written)
+        return csv_file_fullpath
+
+    def check_cancel(self):
+        """Stop between sheets if the conversion is cancelled."""
+        if self.cancel.is_set():
+            raise ConvertCancelled("conversion cancelled")
+
+    def report_progress(self, sheet_name=None, rows=0):
+        """Count rows and report the progress to `progress`, if it is set."""
+        state = self.progress_state
+        state["rows"] += rows
+        if self.progress is None:
+            return
+        elapsed = time.perf_counter() - state["start"]
+        rows_per_sec = state["rows"] / elapsed if elapsed > 0 else 0.0
+        self.progress(
+            state["xls_file"], sheet_name, state["done"], state["total"], rows_per_sec
+        )
+
+    def log_summary(self):
+        """Log the summary of a run."""
+        self.log_metrics()
+        cached_cnt = sum(1 for m in self.metrics.values() if m.get("cached"))
+        if cached_cnt:
+            self.log(INFO, f"cached XLS: \t\t{cached_cnt}")
+        self.log(INFO, f"total GDScript: \t\t{self.gd_cnt}")
+        self.log(INFO, f"written files: \t\t{self.written_cnt}")
+        self.log(INFO, f"unchanged files: \t{self.unchanged_cnt}")
+        self.log(INFO, "done.")
+
+    def log_metrics(self):
+        """Log the metrics table of converted workbooks and sheets.
+
+        Times are in seconds, bytes are of the outputs.
+        """
+        if not self.metrics:
+            return
+        stages = ("open", "header", "rows", "gd", "csv")
+        counts = ("row_count", "cell_count", "gd_bytes", "csv_bytes")
+        lines = []
+        total = dict.fromkeys(stages + counts, 0)
+        for xls_file, metrics in self.metrics.items():
+            # open time is on the first sheet of a workbook
+            time_open = metrics["open"]
+            for sheet_name, sheet in metrics["sheets"].items():
+                line = dict(sheet, open=time_open)
+                time_open = 0.0
+                for k in total:
+                    total[k] += line.get(k, 0)
+                lines.append((f"{xls_file}/{sheet_name}", line))
+        lines.append(("total", total))
+
+        name_len = max(len(name) for name, _ in lines)
+        self.log(
+            INFO,
+            f"{'sheet':{name_len}} {'open':>7} {'header':>7} {'parse':>7} {'gd':>7}"
+            f" {'csv':>7} {'rows':>8} {'cells':>9} {'bytes':>10}",
+        )
+        for name, line in lines:
+            times = " ".join(f"{line.get(k, 0):7.3f}" for k in stages)
+            out_bytes = line.get("gd_bytes", 0) + line.get("csv_bytes", 0)
+            self.log(
+                INFO,
+                f"{name:{name_len}} {times}"
+                f" {line['row_count']:8d} {line['cell_count']:9d} {out_bytes:10d}",
+            )
+
+        if self.metrics_file:
+            with open(self.metrics_file, "w", encoding="utf-8") as json_file:
+                json_file.write(json.dumps(self.metrics, indent=True))
+            self.log(INFO, f"save metrics at {self.metrics_file}")
+
+    def log_output(self, xls_file, out_name, new_gd=True, written=True):
+        """Log an output file with the GDScript counter.
+
+        In a worker process the record is kept and replayed by the main process.
+        """
+        if self.records is not None:
+            self.records.append((xls_file, out_name, new_gd, written))
+            return
+        if new_gd:
+            self.gd_cnt += 1
+        if written:
+            self.written_cnt += 1
+            self.log(
+                SUCCESS,
+                f"[{self.gd_cnt:02d}] {xls_file:{self.max_xls_name_len}} => {out_name}",
+            )
+        else:
+            self.unchanged_cnt += 1
+            self.log(
+                SUCCESS,
+                f"[{self.gd_cnt:02d}] {xls_file:{self.max_xls_name_len}}"
+                f" == {out_name} (unchanged)",
+            )
 
-    config = {
-        "input_folder": INPUT_FOLDER,
-        "output_gd_folder": OUTPUT_GD_FOLDER,
-        "output_gd_name_template": OUTPUT_GD_NAME_TEMPLATE,
-        "output_csv_folder": OUTPUT_CSV_FOLDER,
-        "output_csv_name_template": OUTPUT_CSV_NAME_TEMPLATE,
-    }
-    with open(CONFIG_FILE, "r+", encoding="utf-8") as json_file:
-        json_file.truncate(0)  # need '0' when using r+
-        json_file.write(json.dumps(config, indent=True))
-        json_file.close()
-        log(INFO, f"save config at {CONFIG_FILE}")
-
-
-def main():
-    """Main function."""
-    global GD_CNT
-    GD_CNT = 0
-    input_path = INPUT_FOLDER
-    output_gd_path = OUTPUT_GD_FOLDER
-    output_csv_path = OUTPUT_CSV_FOLDER
-    log(INFO, f"input path: \t{input_path}")
-    log(INFO, f"output *.gd path: \t{output_gd_path}")
-    log(INFO, f"output *.csv path: \t{output_csv_path}")
-    if not os.path.exists(input_path):
-        raise RuntimeError("input path does NOT exist.")
-    if not os.path.exists(output_gd_path):
-        os.mkdir(output_gd_path)
-        log(INFO, f"make a new dir: \t{output_gd_path}")
-    if not os.path.exists(output_csv_path):
-        os.mkdir(output_csv_path)
-        log(INFO, f"make a new dir: \t{output_csv_path}")
-
-    xls_files = os.listdir(input_path)
-    if len(xls_files) == 0:
-        raise RuntimeError("input dir is empty.")
-
-    # find max string len
-    global MAX_XLS_NAME_LEN
-    MAX_XLS_NAME_LEN = len(max(xls_files, key=len))
-
-    # filer files by .xls
-    xls_files = [
-        x
-        for x in xls_files
-        if (x[-4:] in [".xls"] or x[-5:] in [".xlsm", ".xlsx"]) and x[0:2] not in ["~$"]
-    ]
-    log(INFO, f"total XLS: \t\t{len(xls_files)}")
+    def log(self, prefix, s):
+        """Print logs, they are written in batches by `sink`."""
+        self.sink.emit(prefix, s)
 
-    for _, xls_file in enumerate(xls_files):
-        t, ret, err_str = make_table(f"{INPUT_FOLDER}/{xls_file}")
-        if ret != 0:
-            GD_CNT += 1
-            log(FAILED, f"[{GD_CNT:02d}] {xls_file}")
-            raise RuntimeError(err_str)
-        # print(json.dumps(t, indent=4))
-        write_to_gd_script(t, output_gd_path, output_csv_path, xls_file)
 
+def is_xls_file(filename):
+    """Check if a file is a workbook, lock files of Excel are skipped."""
+    return (
+        filename[-4:] in [".xls"] or filename[-5:] in [".xlsm", ".xlsx"]
+    ) and filename[0:2] not in ["~$"]
 
-def run():
-    """Function entry."""
-    # print command line arguments
-    for arg in sys.argv[1:]:
-        if arg == "-c":
-            global IS_COLOR
-            IS_COLOR = True
 
+def scan_xls_files(input_path):
+    """Get size and mtime of the workbooks in a folder."""
+    states = {}
+    try:
+        entries = list(os.scandir(input_path))
+    except OSError:
+        return states
+    for entry in entries:
+        if not is_xls_file(entry.name):
+            continue
+        try:
+            stat = entry.stat()
+        except OSError:
+            continue
+        states[entry.name] = (stat.st_size, stat.st_mtime_ns)
+    return states
+
+
+def convert_workbook(
+    config,
+    locale_index,
+    xls_file,
+    output_gd_path,
+    output_csv_path,
+    cache=None,
+    file_hash=None,
+):
+    """Convert one workbook in a worker process.
+
+    Returns a dict of the output records, the output files, the metrics,
+    the updated locale index and the error string, None if succeeded.
+    """
+    conv = Converter(config, cache=cache)
+    conv.records = []
+    conv.locale_index = dict(locale_index)
+    result = {"records": conv.records, "error": None}
     try:
-        log(INFO, f"time: \t\t{datetime.datetime.now()}")
-        load_config()
-        main()
-        log(INFO, f"total GDScript: \t\t{GD_CNT}")
-        log(INFO, "done.")
-        # log(INFO, 'press Enter to exit...')
-        # input()
+        t, ret, err_str = conv.load_table(xls_file, file_hash)
+        if ret != 0:
+            result["error"] = err_str
+            return result
+        result["outputs"] = conv.write_to_gd_script(
+            t, output_gd_path, output_csv_path, xls_file
+        )
+        result["metrics"] = t["metrics"]
+        result["locales"] = conv.locale_index
+        return result
     except (
         RuntimeError,
         ValueError,
@@ -797,36 +2676,227 @@ def run():
         AssertionError,
         PermissionError,
     ) as err:
-        err_type = str(type(err))
-        err_type = re.findall(r"<class \'(.+?)\'>", err_type)[0]
-        err_str = f"[{err_type + str(err)}] "
-        log(ERROR, err_str)
-        # log(INFO, 'check error please...')
-        # input()
-
-
-def set_gui(frame):
-    """Set GUI."""
-    if frame is not None:
-        global GUI, INFO, ERROR, SUCCESS, FAILED
-        GUI = frame
-        INFO = "info"
-        ERROR = "error"
-        SUCCESS = "sucess"
-        FAILED = "failed"
-    else:
-        log(ERROR, "frame is None.")
+        result["error"] = format_error(err)
+        return result
 
 
-def log(prefix, s):
-    """Print logs."""
-    if GUI is not None:
-        GUI.write(prefix, s)
-    elif IS_COLOR:
-        print(f'[{prefix["c"]}] {s}')
+def check_workbook(config, xls_file):
+    """Check one workbook, in a worker process or not. Return all errors."""
+    errors = []
+    try:
+        make_table(f"{config['input_folder']}/{xls_file}", errors)
+    except Exception as err:  # pylint: disable=broad-except
+        errors.append((None, None, None, format_error(err)))
+    return errors
+
+
+def get_file_state(filename, record):
+    """Get size, mtime and content hash of a file.
+
+    The hash in the record is reused if size and mtime are the same.
+    """
+    stat = os.stat(filename)
+    state = {"size": stat.st_size, "mtime": stat.st_mtime_ns}
+    if (
+        record is not None
+        and record.get("size") == state["size"]
+        and record.get("mtime") == state["mtime"]
+    ):
+        state["hash"] = record.get("hash")
     else:
-        print(f'[{prefix["b"]}] {s}')
+        state["hash"] = get_file_hash(filename)
+    return state
+
+
+def get_file_hash(filename):
+    """Get content hash of a file."""
+    import hashlib  # pylint: disable=import-outside-toplevel
+
+    h = hashlib.sha1()
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def is_up_to_date(record, state):
+    """Check if a workbook is the same as the manifest and its outputs exist."""
+    return (
+        record is not None
+        and record.get("hash") == state["hash"]
+        and all(os.path.isfile(x) for x in record.get("outputs", []))
+    )
+
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    import argparse  # pylint: disable=import-outside-toplevel
+
+    parser = argparse.ArgumentParser(
+        prog="tool_xls2gd", description="Convert Excel files to GDScript files."
+    )
+    parser.add_argument("-c", action="store_true", help="colorful logs")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        metavar="N",
+        help="convert workbooks with N processes, 0 for all cores, "
+        "1 by default and all cores with --check",
+    )
+    parser.add_argument(
+        "-f", "--force", action="store_true", help="reconvert unchanged workbooks"
+    )
+    parser.add_argument(
+        "-w",
+        "--watch",
+        action="store_true",
+        help="keep running and reconvert workbooks when they are saved",
+    )
+    parser.add_argument(
+        "-m", "--metrics", metavar="FILE", help="write metrics of the run to a JSON file"
+    )
+    parser.add_argument(
+        "-p",
+        "--profile",
+        nargs="?",
+        const="./profile",
+        metavar="DIR",
+        help="profile each workbook into DIR, ./profile by default",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=CACHE_SIZE >> 20,
+        metavar="MB",
+        help=f"keep parsed workbooks in {CACHE_FOLDER} up to MB megabytes, "
+        f"0 to parse every workbook, {CACHE_SIZE >> 20} by default",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="check every workbook and report all errors, write no files",
+    )
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+
+def get_options(args):
+    """Get the options of Converter from parsed command line arguments.
+
+    The CLI and the GUI both use them, so xls2gd.exe takes the same flags.
+    """
+    jobs = args.jobs
+    if jobs is None:
+        jobs = 0 if args.check else 1
+    return {
+        "jobs": jobs if jobs > 0 else (os.cpu_count() or 1),
+        "force": args.force,
+        "metrics_file": args.metrics,
+        "profile_folder": args.profile,
+        "config_file": CONFIG_FILE,
+        "manifest_file": MANIFEST_FILE,
+        "cache": (
+            TableCache(CACHE_FOLDER, args.cache_size << 20)
+            if args.cache_size > 0
+            else None
+        ),
+    }
+
+
+def run():
+    """Function entry."""
+    args = parse_args(sys.argv[1:])
+    conv = Converter(
+        sink=LogSink(
+            functools.partial(write_console, color=args.c), LOG_FLUSH_INTERVAL
+        ),
+        **get_options(args),
+    )
+    result = conv.run(check=args.check)
+    # the exit code gates CI, a bad config or input folder fails it too
+    if args.check and (result["error"] or result["error_cnt"] > 0):
+        sys.exit(1)
+    # log(INFO, 'press Enter to exit...')
+    # input()
+
+    if args.watch:
+        conv.watch()
+        conv.sink.flush()
+
+
+def convert(config, **options):
+    """Convert with a config dict and the options of Converter, return the result."""
+    return Converter(config, **options).run()
+
+
+def format_error(err):
+    """Format an exception for logs."""
+    import re  # pylint: disable=import-outside-toplevel
+
+    err_type = str(type(err))
+    err_type = re.findall(r"<class \'(.+?)\'>", err_type)[0]
+    return f"[{err_type + str(err)}] "
+
+
+class LogSink:
+    """Buffer of log records, written in batches by a flush thread.
+
+    `write` gets a list of (prefix, text) records, at most once every
+    `interval` seconds, so the cost of logging stays flat however many
+    lines are logged. Call flush() to write the rest at once.
+    """
+
+    def __init__(self, write, interval):
+        self.write = write
+        self.interval = interval
+        self.records = []
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.thread = None
+
+    def emit(self, prefix, s):
+        """Add a record, it is written by the next flush."""
+        with self.lock:
+            self.records.append((prefix, s))
+            # 空闲时线程退出, 有新记录再启动
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+
+    def run(self):
+        """Flush thread, it stops once there is nothing to flush."""
+        while True:
+            time.sleep(self.interval)
+            with self.lock:
+                if not self.records:
+                    self.thread = None
+                    return
+            self.flush()
+
+    def flush(self):
+        """Write all buffered records in one batch."""
+        with self.flush_lock:
+            with self.lock:
+                records, self.records = self.records, []
+            if records:
+                self.write(records)
+
+
+def write_console(records, color=False):
+    """Write a batch of log records to the console."""
+    key = "c" if color else "b"
+    sys.stdout.write("".join(f"[{prefix[key]}] {s}\n" for prefix, s in records))
+    sys.stdout.flush()
+
+
+LOG_FLUSH_INTERVAL = 0.1
 
 
 if __name__ == "__main__":
+    # freeze_support() works only in a frozen build, skip importing it otherwise
+    if getattr(sys, "frozen", False):
+        import multiprocessing  # pylint: disable=import-outside-toplevel
+
+        multiprocessing.freeze_support()
     run()
@@ -31,3 +31,33 @@ exe = EXE(pyz,
           upx_exclude=[],
           runtime_tmpdir=None,
           console=False , icon='img\\icon.ico')
+
+# 命令行版本不带 wx, 单文件启动时要解压的内容少得多
+cli = Analysis(['tool_xls2gd.py'],
+             pathex=['.\\godot-xls2gd'],
+             binaries=[],
+             datas=[],
+             hiddenimports=[],
+             hookspath=[],
+             runtime_hooks=[],
+             excludes=['wx', 'tkinter'],
+             win_no_prefer_redirects=False,
+             win_private_assemblies=False,
+             cipher=block_cipher,
+             noarchive=False)
+cli_pyz = PYZ(cli.pure, cli.zipped_data,
+             cipher=block_cipher)
+cli_exe = EXE(cli_pyz,
+          cli.scripts,
+          cli.binaries,
+          cli.zipfiles,
+          cli.datas,
+          [],
+          name='xls2gd_cli',
+          debug=False,
+          bootloader_ignore_signals=False,
+          strip=False,
+          upx=True,
+          upx_exclude=[],
+          runtime_tmpdir=None,
+          console=True , icon='img\\icon.ico')